@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+
+"""
+Play many headless games with a bot to measure the difficulty of the levels.
+
+Each game runs in its own process with a seeded random generator, so a
+run can be reproduced with the same seed. Only the logic is run, nothing
+is drawn and the sound is muted. The settings and the scores of the
+workers are in a temporary directory, never in the files of the player.
+
+Games can also start from a snapshot of a game in progress, for instance
+a quick save (F5 in game) just before a boss, instead of playing all the
+levels before it.
+
+Usage:
+    python balance.py --games 1000 --bot aim --seed 0
+    python balance.py --games 200 --json results.json
+    python balance.py --games 200 --snapshot src/assets/quicksave
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+from collections import Counter, defaultdict
+from functools import partial
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+from time import perf_counter, time
+from types import SimpleNamespace
+
+# Headless, before pygame is imported.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+# Otherwise SDL catches SIGTERM and the pool cannot stop its workers.
+os.environ.setdefault("SDL_NO_SIGNAL_HANDLERS", "1")
+
+import pygame
+
+from src.engine import *
+from src.states import GameState, SkillPickUp
+from src.level import LEVELS
+from src.objects import Enemy
+
+FIRE_DELAY = 6
+"""Frames between shots, as when holding the fire button."""
+
+
+class Bot:
+    """Moves randomly, fires all the time and picks random skills."""
+
+    def __init__(self):
+        self.direction = pygame.Vector2()
+
+    def play(self, game: GameState, frame: int):
+        if frame % 30 == 0:
+            self.direction = pygame.Vector2(
+                random.uniform(-1, 1), random.uniform(-1, 1)
+            )
+        self.move(game, self.direction)
+
+        if frame % FIRE_DELAY == 0:
+            game.player.fire(game)
+
+    def move(self, game: GameState, direction):
+        game.player.move_horizontally(SimpleNamespace(value=direction.x))
+        game.player.move_vertically(SimpleNamespace(value=direction.y))
+
+    def pick_skill(self, state: SkillPickUp):
+        reachable = [node for node in state.tree.bfs() if node.reachable()]
+        for node in state.tree.bfs():
+            node.power.selected = False
+        random.choice(reachable).power.selected = True
+        state.select()
+
+
+class AimBot(Bot):
+    """Stays under the closest enemy, away from the bottom, and fires."""
+
+    def play(self, game: GameState, frame: int):
+        player = game.player
+        enemies = list(game.get_all(Enemy))
+
+        direction = pygame.Vector2()
+        if enemies:
+            target = min(enemies, key=lambda e: abs(e.center.x - player.center.x))
+            direction.x = clamp((target.center.x - player.center.x) / 20, -1, 1)
+        direction.y = clamp((WORLD.bottom - 60 - player.center.y) / 40, -1, 1)
+        self.move(game, direction)
+
+        if frame % FIRE_DELAY == 0:
+            player.fire(game)
+
+
+BOTS = {"random": Bot, "aim": AimBot}
+
+
+screen: Screen = None
+"""The window of the process, nothing is drawn on it."""
+
+
+def init_worker(directory: str):
+    global screen
+
+    # Each worker in its own directory, as the workers write at the same time.
+    directory = Path(tempfile.mkdtemp(dir=directory))
+    Settings.PATH = directory / "settings.json"
+    scores.path = directory / "scores.sqlite"
+    GameState.QUICKSAVE = directory / "quicksave"
+
+    pygame.init()
+    settings.mute = True
+    screen = FixedScreen(SIZE)
+    screen.resize()
+
+
+def play_game(args):
+    """Play one game and return its statistics."""
+
+    seed, bot_name, max_frames, snapshot_data = args
+    if snapshot_data is None:
+        random.seed(seed)
+        app = App(GameState, screen)
+    else:
+        app = App(partial(load_snapshot, snapshot_data, restore_rng=False), screen)
+        # After loading, as the enemies of the snapshot must not be random.
+        random.seed(seed)
+    bot = BOTS[bot_name]()
+
+    game: GameState = app.state
+    player = game.player
+
+    level = -1
+    level_start = 0
+    levels = defaultdict(
+        lambda: {"reached": False, "cleared": False, "frames": 0, "damage": 0.0}
+    )
+    frame_times = Counter()
+    """Histogram of the logic time per frame, by tenth of millisecond."""
+
+    def on_hit(event):
+        levels[level]["damage"] += event.amount
+
+    def on_state_changed(event):
+        # The skill pick up is shown after each cleared level.
+        if isinstance(event.current, SkillPickUp):
+            levels[level]["cleared"] = True
+            levels[level]["frames"] = frame - level_start
+
+    game.events.subscribe(Hit, on_hit, player)
+    game.events.subscribe(StateChanged, on_state_changed, game)
+
+    frame = 0
+    while frame < max_frames and player.alive:
+        state = app.state
+        if isinstance(state, SkillPickUp):
+            bot.pick_skill(state)
+        elif state is game:
+            bot.play(game, frame)
+        else:
+            break
+
+        lvl = getattr(game, "lvl", None)
+        if lvl is not None and LEVELS.index(lvl.data) != level:
+            level = LEVELS.index(lvl.data)
+            level_start = frame
+            levels[level]["reached"] = True
+
+        start = perf_counter()
+        state.logic()
+        frame_times[int((perf_counter() - start) * 10_000)] += 1
+
+        app.state = state.next_state
+        frame += 1
+
+        if levels.get(len(LEVELS) - 1, {}).get("cleared"):
+            break  # Won
+
+    levels.pop(-1, None)
+    return {
+        "seed": seed,
+        "frames": frame,
+        "score": player.score,
+        "died": not player.alive,
+        "levels": dict(levels),
+        "frame_times": dict(frame_times),
+    }
+
+
+def percentile(histogram, p):
+    total = sum(histogram.values())
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen >= p * total:
+            return value
+    return max(histogram)
+
+
+def report(results, duration):
+    lines = []
+    games = len(results)
+
+    lines.append(
+        f"{games} games in {duration:.1f}s, "
+        f"{sum(r['died'] for r in results)} deaths, "
+        f"mean score {statistics.mean(r['score'] for r in results):.0f}."
+    )
+    lines.append("")
+    lines.append(
+        f"{'level':>5} {'reached':>8} {'cleared':>8} {'clear rate':>11} "
+        f"{'time to clear (s)':>18} {'damage taken':>13}"
+    )
+
+    for level in range(len(LEVELS)):
+        stats = [r["levels"][level] for r in results if level in r["levels"]]
+        reached = [s for s in stats if s["reached"]]
+        cleared = [s for s in reached if s["cleared"]]
+        if not reached:
+            continue  # Before the snapshot or after every game ended
+
+        times = [s["frames"] / 60 for s in cleared]
+        time_to_clear = (
+            f"{statistics.mean(times):.1f} ± {statistics.pstdev(times):.1f}"
+            if times
+            else "-"
+        )
+        damage = statistics.mean(s["damage"] for s in reached)
+
+        lines.append(
+            f"{level + 1:>5} {len(reached):>8} {len(cleared):>8} "
+            f"{len(cleared) / len(reached):>11.0%} {time_to_clear:>18} {damage:>13.0f}"
+        )
+
+    frame_times = Counter()
+    for r in results:
+        frame_times.update(r["frame_times"])
+    mean = sum(t * n for t, n in frame_times.items()) / sum(frame_times.values())
+    lines.append("")
+    lines.append(
+        f"Logic time per frame: mean {mean / 10:.1f} ms, "
+        f"median {percentile(frame_times, 0.5) / 10:.1f} ms, "
+        f"p95 {percentile(frame_times, 0.95) / 10:.1f} ms, "
+        f"max {max(frame_times) / 10:.1f} ms."
+    )
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("--bot", choices=BOTS, default="aim")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the first game.")
+    parser.add_argument(
+        "--minutes", type=float, default=15, help="Maximum duration of a game."
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=cpu_count())
+    parser.add_argument("--json", help="Save the statistics of each game in this file.")
+    parser.add_argument(
+        "--snapshot", help="Start the games from this snapshot of a GameState."
+    )
+    args = parser.parse_args()
+
+    snapshot_data = None
+    if args.snapshot:
+        with open(args.snapshot, "rb") as f:
+            snapshot_data = f.read()
+
+    max_frames = int(args.minutes * 60 * 60)
+    games = [
+        (args.seed + i, args.bot, max_frames, snapshot_data) for i in range(args.games)
+    ]
+
+    start = time()
+    with tempfile.TemporaryDirectory() as directory, Pool(
+        args.jobs, init_worker, (directory,)
+    ) as pool:
+        results = []
+        for result in pool.imap_unordered(play_game, games):
+            results.append(result)
+            print(
+                f"\rPlayed {len(results)}/{args.games} games", end="", file=sys.stderr
+            )
+    print(file=sys.stderr)
+    results.sort(key=lambda r: r["seed"])
+
+    print(report(results, time() - start))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python
+
+"""
+Micro-benchmarks of the code that runs for every object and particle, every frame.
+
+For each case, this reports the time per call and the memory allocated per
+call, measured with tracemalloc as the peak of memory during the call.
+Objects reused from free lists, like most floats and small tuples, do not
+count, but new vectors, rects, sets... do. 0 B means no allocation.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --calls 100000 particle
+"""
+
+import argparse
+import os
+import tracemalloc
+from time import perf_counter
+
+# Headless, before pygame is imported.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from src.engine import *
+
+CASES = {}
+
+
+def case(func):
+    """Register a benchmark. The function sets it up and returns what to call."""
+    CASES[func.__name__] = func
+    return func
+
+
+@case
+def object_logic():
+    state = State()
+    obj = state.add(Object((0, 0), (10, 10), (1, 0.5)))
+    state.logic()  # Flush the added objects
+    return obj.logic
+
+
+@case
+def particle_logic():
+    particle = SquareParticle().builder().at((0, 0), 30).velocity(1).build()
+    particle.lifespan = float("inf")
+    return particle.logic
+
+
+@case
+def turning_particle_logic():
+    particle = SquareParticle().builder().at((0, 0), 30).velocity(1, 3).build()
+    particle.lifespan = float("inf")
+    return particle.logic
+
+
+@case
+def animated_particle_logic():
+    def new():
+        return (
+            SquareParticle("white")
+            .builder()
+            .living(60)
+            .anim_blink()
+            .anim_bounce_size()
+            .anim_fade(0.5)
+            .build()
+        )
+
+    particle = new()
+
+    def logic():
+        nonlocal particle
+        particle.logic()
+        if not particle.alive:
+            particle = new()
+
+    return logic
+
+
+@case
+def particle_system_logic():
+    """One frame of 100 particles, per particle."""
+
+    system = ParticleSystem()
+    for i in range(100):
+        # Still, or they would leave the screen and be removed
+        system.add(SquareParticle().builder().at(SCREEN.center, i).velocity(0).build())
+    for particle in system:
+        particle.lifespan = float("inf")
+
+    def logic():
+        system.logic()
+
+    logic.per_call = 100
+    return logic
+
+
+@case
+def explosion():
+    """The particles of a ship dying, from its death to the last particle."""
+
+    from src.objects import Enemy
+
+    state = State()
+    ship = Enemy((100, 100))
+
+    def explode():
+        ship.on_death(state)
+        while state.particles:
+            state.particles.logic()
+
+    return explode
+
+
+@case
+def laser_volley():
+    """Frames of a boss firing 5 lasers at the player, until they end."""
+
+    from src.objects import Boss, Enemy, Laser
+
+    class Target(Enemy):
+        """Stands in for the player, that needs a GameState."""
+
+        TEAM = "player"
+        OPPONENTS = "enemy"
+
+        def hit(self, bullet):
+            pass
+
+    state = State()
+    boss = state.add(Boss((W / 2, 80)))
+    state.player = state.add(Target((W / 2, H - 60)))
+    boss.scripts.clear()  # They need a GameState
+    state.player.scripts.clear()
+    gfx = GFX(pygame.Surface(SIZE))
+
+    def volley():
+        state.player.life = 10 ** 9
+        lasers = [
+            state.add(Laser(boss, state.player, 40, 30, 30, offset_angle=offset))
+            for offset in (-60, -30, 0, 30, 60)
+        ]
+        while any(laser.alive for laser in lasers):
+            state.logic()
+            state.draw(gfx)
+            gfx.flush()
+
+    volley.calls = 10
+    return volley
+
+
+@case
+def bullet_ring():
+    """A ring of 360 bullets from the center of the world, until they are gone."""
+
+    from src.objects import Bullet, Enemy
+
+    state = State()
+    owner = Enemy(WORLD.center)
+    gfx = GFX(pygame.Surface(SIZE))
+
+    def ring():
+        for angle in range(360):
+            state.add(Bullet(WORLD.center, from_polar(1, angle), owner))
+        state.logic()
+        while len(state.objects) > 1:  # Only the Debug
+            state.logic()
+            state.draw(gfx)
+            gfx.flush()
+
+    ring.calls = 10
+    return ring
+
+
+@case
+def gfx_blits():
+    """Recording and drawing 100 sprites, per sprite."""
+
+    gfx = GFX(pygame.Surface(SIZE))
+    sprite = pygame.Surface((16, 16), pygame.SRCALPHA)
+
+    def draw():
+        for i in range(100):
+            gfx.blit(sprite, center=(i * 6, i * 3))
+        gfx.flush()
+
+    draw.per_call = 100
+    return draw
+
+
+@case
+def inputs_trigger():
+    """A frame of the inputs of a menu, with a joystick flooding axis motions."""
+
+    from pygame.locals import (
+        JOYAXISMOTION,
+        KEYDOWN,
+        KEYUP,
+        K_DOWN,
+        K_ESCAPE,
+        K_LEFT,
+        K_RETURN,
+        K_RIGHT,
+        K_SPACE,
+        K_UP,
+        K_a,
+        K_d,
+        K_m,
+        K_q,
+        K_s,
+        K_w,
+    )
+
+    inputs = Inputs()
+    inputs["quit"] = Button(QuitEvent(), K_ESCAPE, K_q, JoyButton(JOY_BACK))
+    inputs["mute"] = Button(K_m, JoyButton(11))
+    inputs["up"] = Button(K_UP, K_w, JoyAxisTrigger(JOY_VERT_LEFT, -0.5, False))
+    inputs["down"] = Button(K_DOWN, K_s, JoyAxisTrigger(JOY_VERT_LEFT))
+    inputs["select"] = Button(K_RETURN, K_SPACE, JoyButton(JOY_A))
+    inputs["horizontal"] = Axis([K_a, K_LEFT], [K_d, K_RIGHT], JoyAxis(JOY_HORIZ_LEFT))
+    inputs["vertical"] = Axis([K_w, K_UP], [K_s, K_DOWN], JoyAxis(JOY_VERT_LEFT))
+
+    events = [
+        pygame.event.Event(JOYAXISMOTION, joy=0, instance_id=0, axis=i % 6, value=0.3)
+        for i in range(60)
+    ]
+    events += [
+        pygame.event.Event(KEYDOWN, key=K_a, mod=0, unicode="a", scancode=4),
+        pygame.event.Event(KEYUP, key=K_a, mod=0, unicode="a", scancode=4),
+    ]
+    return lambda: inputs.trigger(events)
+
+
+@case
+def clamp_length_short():
+    vec = pygame.Vector2(1, 1)
+    return lambda: clamp_length(vec, 10)
+
+
+@case
+def clamp_length_long():
+    vec = pygame.Vector2(100, 100)
+
+    def clamp():
+        vec.update(100, 100)
+        clamp_length(vec, 10)
+
+    return clamp
+
+
+@case
+def part_perp_to_():
+    u = pygame.Vector2(3, 4)
+    v = pygame.Vector2(1, 0)
+    return lambda: part_perp_to(u, v)
+
+
+@case
+def angle_towards_():
+    return lambda: angle_towards(10, 300, 5)
+
+
+WINDOW_SIZES = {
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+
+
+def upscale_case(upscaler, name, size):
+    def setup():
+        screen = ExtendFieldOfViewScreen(SIZE)
+        screen.upscaler = upscaler
+        screen.resize(size)
+        screen.draw_surface.fill("#203040")
+
+        def update():
+            screen.update_window()
+
+        update.calls = 500
+        return update
+
+    setup.__name__ = f"upscale_{type(upscaler).__name__}_{name}"
+    case(setup)
+
+
+def renderer_case(name, size):
+    def setup():
+        screen = RendererScreen(SIZE)
+        screen.resize(size)
+        screen.draw_surface.fill("#203040")
+
+        def update():
+            screen.present()
+
+        update.calls = 500
+        return update
+
+    setup.__name__ = f"present_RendererScreen_{name}"
+    case(setup)
+
+
+for _name, _size in WINDOW_SIZES.items():
+    upscale_case(Upscaler(), _name, _size)
+    upscale_case(NumpyUpscaler(), _name, _size)
+    renderer_case(_name, _size)
+
+
+def measure(func, calls):
+    """Return the time (s) and the memory allocated (bytes) per call."""
+
+    func()  # Warm up caches
+    per_call = getattr(func, "per_call", 1)
+    calls = min(calls, getattr(func, "calls", calls))
+
+    # The best of a few runs, as other processes only make it slower.
+    duration = float("inf")
+    for _ in range(5):
+        start = perf_counter()
+        for _ in range(calls // 5):
+            func()
+        duration = min(duration, perf_counter() - start)
+
+    # Separately, as tracemalloc slows everything down.
+    get, reset = tracemalloc.get_traced_memory, tracemalloc.reset_peak
+    allocated = 0
+    tracemalloc.start()
+    for _ in range(min(calls, 1000)):
+        current = get()[0]
+        reset()
+        func()
+        allocated += get()[1] - current
+    tracemalloc.stop()
+
+    return (
+        duration / (calls // 5) / per_call,
+        allocated / min(calls, 1000) / per_call,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("cases", nargs="*", help="Only run the cases containing these.")
+    parser.add_argument("-n", "--calls", type=int, default=20_000)
+    args = parser.parse_args()
+
+    pygame.init()
+    FixedScreen(SIZE).resize()
+
+    print(f"{'case':<24} {'time':>10} {'allocated':>10}")
+    for name, setup in CASES.items():
+        if args.cases and not any(c in name for c in args.cases):
+            continue
+
+        duration, allocated = measure(setup(), args.calls)
+        print(
+            f"{name.strip('_'):<24} {duration * 1e6:>7.2f} µs {allocated:>8.0f} B"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -13,4 +13,6 @@ from src.engine import SIZE, App, IntegerScaleScreen
 from src.states.loading import LoadingState
 
 if __name__ == "__main__":
-    App(LoadingState, IntegerScaleScreen(SIZE)).run()
+    # Draws each frame in a thread, while the next one is computed.
+    pipelined = "--pipelined" in sys.argv[1:]
+    App(LoadingState, IntegerScaleScreen(SIZE), pipelined).run()
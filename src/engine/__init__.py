@@ -1,10 +1,16 @@
 from .app import *
 from .screen import *
 from .gfx import *
+from .events import *
 from .object import *
+from .collisions import *
+from .panel import *
+from .persistence import *
 from .settings import *
+from .scores import *
 from .assets import Animation
 from .state_machine import *
+from .snapshot import *
 from .particles import *
 from .constants import *
 from .utils import *
@@ -1,11 +1,14 @@
+from concurrent.futures import Future, ThreadPoolExecutor
 from time import time
-from typing import Type
+from typing import List, Optional, Type
 
 import pygame
 import sys
 
-from .gfx import GFX
-from .screen import ExtendFieldOfViewScreen, Screen
+from .gfx import GFX, Command
+from .persistence import writer
+from .scores import scores
+from .screen import ExtendFieldOfViewScreen, FrameDiff, Screen
 from .settings import settings
 from .state_machine import GAME_NAME, State, StateMachine, StateOperations
 
@@ -27,15 +30,33 @@ class App(StateMachine):
     MAIN_APP: "App" = None
     MOUSE_VISIBLE = False
 
-    def __init__(self, initial_state: Type[State], resizing: Screen):
+    def __init__(
+        self, initial_state: Type[State], resizing: Screen, pipelined=False
+    ):
+        """
+        Args:
+            initial_state: the first state of the app.
+            resizing: how the frames are shown on the window.
+            pipelined: draw each frame in a thread, while the logic of the
+                next one runs, see present(). Each frame is shown one frame later.
+        """
         App.MAIN_APP = self
 
         self.clock = pygame.time.Clock()
         self.screen = resizing
+        self.frame_diff = FrameDiff()
         self.gfx = GFX(self.screen.draw_surface)
+
+        self.presenter: Optional[ThreadPoolExecutor] = None
+        self.presenting: Optional[Future] = None
+        """The drawing of the last frame, running in the presenter."""
+        if pipelined:
+            self.presenter = ThreadPoolExecutor(1, thread_name_prefix="present")
         pygame.display.set_caption(self.NAME)
 
         pygame.mouse.set_visible(self.MOUSE_VISIBLE)
+        # In the background, so that the best scores are known before they are shown.
+        scores.load()
 
         super().__init__(initial_state)
 
@@ -47,27 +68,87 @@ class App(StateMachine):
         while self.running:
             self.events()
             self.state.logic()
+            self.finish_presenting()
             self.state.draw(self.gfx)
-            self.screen.update_window()
+            self.present()
 
-            pygame.display.update()
             self.clock.tick(self.state.FPS)
 
             frame += 1
             self.state = self.state.next_state
 
+        self.finish_presenting()
+        if self.presenter is not None:
+            self.presenter.shutdown()
+
         duration = time() - start
         print(f"Game played for {duration:.2f} seconds, at {frame / duration:.1f} FPS.")
         settings.save()
+        writer.flush()
+
+    def present(self):
+        """Draw the frame that was just recorded by the state, and show it.
+
+        When pipelined, the draw calls are run and the frame is scaled to the
+        window in the presenter thread, while the main thread goes on with the
+        events and logic of the next frame. The next frame is only recorded
+        once this one is drawn, in finish_presenting(), so what the draw calls
+        blit is not changed meanwhile. pygame releases the GIL while blitting
+        and scaling, so this runs on another core. The display itself is only
+        updated from the main thread, as SDL requires.
+        """
+
+        if self.presenter is None:
+            self.gfx.flush()
+            self.screen.present(self.dirty_rects(self.state))
+        else:
+            self.presenting = self.presenter.submit(
+                self.render, self.gfx, self.gfx.take(), self.state
+            )
+
+    def render(self, gfx: GFX, commands: List[Command], state: State):
+        """Draw the frame and scale it to the window, in the presenter.
+
+        Returns:
+            The rects for finish_presenting() to show.
+        """
+
+        gfx.run(commands)
+        rects = self.dirty_rects(state)
+        if self.screen.PIPELINE:
+            return self.screen.update_window(rects)
+        return rects
+
+    def finish_presenting(self):
+        """Wait for the last frame to be drawn and show it, when pipelined."""
+
+        if self.presenting is not None:
+            rects = self.presenting.result()
+            self.presenting = None
+            if self.screen.PIPELINE:
+                self.screen.show(rects)
+            else:
+                self.screen.present(rects)
+
+    def dirty_rects(self, state: State):
+        """The parts of the frame to show on the window, None for all of it."""
+
+        if state.DIRTY_RECTS:
+            return state.dirty_rects(self.screen.draw_surface, self.frame_diff)
+
+        self.frame_diff.reset()
+        return None
 
     def events(self):
 
         events = list(pygame.event.get())
         for event in events:
             if event.type == pygame.VIDEORESIZE:
+                self.finish_presenting()  # It draws on the old window
                 old = self.screen.draw_surface.get_size()
                 self.screen.resize(event.size)
                 self.gfx = GFX(self.screen.draw_surface)
+                self.frame_diff.reset()
                 new = self.screen.draw_surface.get_size()
                 if old != new:
                     self.state.resize(old, new)
@@ -92,6 +173,7 @@ class App(StateMachine):
             self.state = (StateOperations.POP, None)
 
         settings.save()
+        writer.flush()
 
         sys.exit()
 
@@ -0,0 +1,296 @@
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pygame
+
+from .utils import clamp, from_polar
+
+__all__ = [
+    "Collider",
+    "RectCollider",
+    "CircleCollider",
+    "PointCollider",
+    "SegmentCollider",
+    "CollisionSystem",
+    "collide",
+]
+
+
+class Collider:
+    """
+    A shape attached to an object, that can collide with other colliders.
+
+    Colliders are in a group, like "player" or "enemy". A collider reports
+    collisions only with the colliders whose group is in its targets, by calling
+    its on_collision callback with the other collider. Colliders without targets are
+    passive: they can be hit but never get called.
+
+    The shape is recomputed from the owner once per frame, in update().
+    """
+
+    def __init__(
+        self,
+        owner,
+        group: str,
+        targets: Iterable[str] = (),
+        on_collision: Optional[Callable[["Collider"], None]] = None,
+    ):
+        self.owner = owner
+        self.group = group
+        self.targets = frozenset(targets)
+        self.on_collision = on_collision
+        self.enabled = True
+
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        """Bounding rectangle of the shape, used for the broad phase."""
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.group}, {self.owner})"
+
+    def update(self):
+        """Update the shape and the bounding rect from the owner."""
+        raise NotImplementedError
+
+    def collide(self, other: "Collider"):
+        return collide(self, other)
+
+
+class RectCollider(Collider):
+    """An axis aligned box, the rect of the owner."""
+
+    def update(self):
+        self.rect = self.owner.rect
+
+
+class CircleCollider(Collider):
+    """A disk around the center of the owner."""
+
+    def __init__(self, owner, group, radius, targets=(), on_collision=None):
+        super().__init__(owner, group, targets, on_collision)
+        self.radius = radius
+        self.center = pygame.Vector2()
+
+    def update(self):
+        self.center = self.owner.center
+        r = self.radius
+        self.rect = pygame.Rect(self.center.x - r, self.center.y - r, 2 * r, 2 * r)
+
+
+class PointCollider(Collider):
+    """The position of the owner."""
+
+    def __init__(self, owner, group, targets=(), on_collision=None):
+        super().__init__(owner, group, targets, on_collision)
+        self.pos = pygame.Vector2()
+
+    def update(self):
+        self.pos = pygame.Vector2(self.owner.pos)
+        self.rect = pygame.Rect(self.pos, (1, 1))
+
+
+class SegmentCollider(Collider):
+    """A segment that starts on the owner's position and goes :length: in the direction of its angle."""
+
+    def __init__(self, owner, group, length, targets=(), on_collision=None):
+        super().__init__(owner, group, targets, on_collision)
+        self.length = length
+        self.start = pygame.Vector2()
+        self.end = pygame.Vector2()
+
+    def update(self):
+        self.start = pygame.Vector2(self.owner.pos)
+        self.end = self.start + from_polar(self.length, self.owner.angle)
+        left = min(self.start.x, self.end.x)
+        top = min(self.start.y, self.end.y)
+        self.rect = pygame.Rect(
+            left,
+            top,
+            max(self.start.x, self.end.x) - left + 1,
+            max(self.start.y, self.end.y) - top + 1,
+        )
+
+
+# Narrow phase. Each function gets the two colliders
+# and returns whether they overlap.
+
+
+def _rect_rect(a: RectCollider, b: RectCollider):
+    return a.rect.colliderect(b.rect)
+
+
+def _rect_circle(a: RectCollider, b: CircleCollider):
+    closest = (
+        clamp(b.center.x, a.rect.left, a.rect.right),
+        clamp(b.center.y, a.rect.top, a.rect.bottom),
+    )
+    return b.center.distance_squared_to(closest) < b.radius ** 2
+
+
+def _rect_point(a: RectCollider, b: PointCollider):
+    return a.rect.collidepoint(b.pos)
+
+
+def _rect_segment(a: RectCollider, b: SegmentCollider):
+    return bool(a.rect.clipline(b.start, b.end))
+
+
+def _circle_circle(a: CircleCollider, b: CircleCollider):
+    return a.center.distance_squared_to(b.center) < (a.radius + b.radius) ** 2
+
+
+def _circle_point(a: CircleCollider, b: PointCollider):
+    return a.center.distance_squared_to(b.pos) < a.radius ** 2
+
+
+def _circle_segment(a: CircleCollider, b: SegmentCollider):
+    direction = b.end - b.start
+    length_squared = direction.length_squared()
+    if length_squared == 0:
+        closest = b.start
+    else:
+        t = clamp((a.center - b.start).dot(direction) / length_squared, 0, 1)
+        closest = b.start + t * direction
+    return a.center.distance_squared_to(closest) < a.radius ** 2
+
+
+_NARROW_PHASE = {
+    (RectCollider, RectCollider): _rect_rect,
+    (RectCollider, CircleCollider): _rect_circle,
+    (RectCollider, PointCollider): _rect_point,
+    (RectCollider, SegmentCollider): _rect_segment,
+    (CircleCollider, CircleCollider): _circle_circle,
+    (CircleCollider, PointCollider): _circle_point,
+    (CircleCollider, SegmentCollider): _circle_segment,
+}
+
+
+@lru_cache()
+def _narrow_phase(type_a, type_b):
+    """Find the test for two types of colliders, and whether the arguments have to be swapped."""
+
+    for ta in type_a.__mro__:
+        for tb in type_b.__mro__:
+            if (ta, tb) in _NARROW_PHASE:
+                return _NARROW_PHASE[ta, tb], False
+            if (tb, ta) in _NARROW_PHASE:
+                return _NARROW_PHASE[tb, ta], True
+
+    raise TypeError(
+        f"Collisions between {type_a.__name__} and {type_b.__name__} are not supported."
+    )
+
+
+def collide(a: Collider, b: Collider) -> bool:
+    """Precise test of whether two up-to-date colliders overlap."""
+
+    test, swap = _narrow_phase(type(a), type(b))
+    if swap:
+        return bool(test(b, a))
+    return bool(test(a, b))
+
+
+class CollisionSystem:
+    """
+    Find all the collisions once per frame and dispatch them.
+
+    The broad phase puts the bounding rects of all the colliders in a grid,
+    with one grid per group, so each collider is only tested against
+    the nearby colliders of the groups it targets.
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        # Ordered by insertion, so that collisions are found in the same order
+        self.colliders: Dict[Collider, None] = {}
+        self.groups: Dict[str, List[Collider]] = {}
+        self.grids: Dict[str, Dict[Tuple[int, int], List[Collider]]] = {}
+
+    def add(self, collider: Collider):
+        self.colliders[collider] = None
+
+    def remove(self, collider: Collider):
+        self.colliders.pop(collider, None)
+
+    def add_object(self, obj):
+        for collider in obj.colliders:
+            self.add(collider)
+
+    def remove_object(self, obj):
+        for collider in obj.colliders:
+            self.remove(collider)
+
+    def cells(self, rect: pygame.Rect):
+        s = self.cell_size
+        for x in range(rect.left // s, rect.right // s + 1):
+            for y in range(rect.top // s, rect.bottom // s + 1):
+                yield x, y
+
+    def broad_phase(self):
+        """Update all colliders and sort them by group.
+
+        The grid of a group is built only the first time it is needed
+        in the frame, so groups that are never queried cost nothing.
+        """
+
+        self.groups = defaultdict(list)
+        for collider in self.colliders:
+            if collider.enabled:
+                collider.update()
+                self.groups[collider.group].append(collider)
+        self.grids = {}
+
+    def grid(self, group: str) -> Dict[Tuple[int, int], List[Collider]]:
+        grid = self.grids.get(group)
+        if grid is None:
+            grid = defaultdict(list)
+            for collider in self.groups.get(group, ()):
+                for cell in self.cells(collider.rect):
+                    grid[cell].append(collider)
+            self.grids[group] = grid
+        return grid
+
+    def query(self, rect, *groups: str) -> List[Collider]:
+        """All the colliders in the groups whose bounding rect overlap the rect.
+
+        This is also the neighbour query of the objects, and uses the shapes
+        of the last broad phase, so during the logic they are one frame old.
+        """
+
+        rect = pygame.Rect(rect)
+        found = []
+        seen = set()
+        for group in groups:
+            grid = self.grid(group)
+            if not grid:
+                continue
+            for cell in self.cells(rect):
+                for collider in grid.get(cell, ()):
+                    if collider not in seen and collider.rect.colliderect(rect):
+                        seen.add(collider)
+                        found.append(collider)
+        return found
+
+    def find_collisions(self) -> List[Tuple[Collider, Collider]]:
+        """All the pairs (collider, target) that overlap this frame."""
+
+        pairs = []
+        for collider in self.colliders:
+            if not collider.enabled or not collider.targets:
+                continue
+            for other in self.query(collider.rect, *collider.targets):
+                if other.owner is not collider.owner and collider.collide(other):
+                    pairs.append((collider, other))
+        return pairs
+
+    def logic(self):
+        """Run the broad phase, then call the callbacks for every collision.
+
+        Collisions are skipped when one of the objects died in an earlier callback,
+        so a bullet that hit a ship does not hit a second one.
+        """
+
+        self.broad_phase()
+        for collider, other in self.find_collisions():
+            if collider.owner.alive and other.owner.alive:
+                collider.on_collision(other)
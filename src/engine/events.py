@@ -0,0 +1,84 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Type, TypeVar
+
+__all__ = ["Event", "Spawned", "Died", "Hit", "StateChanged", "EventBus"]
+
+
+@dataclass(frozen=True)
+class Event:
+    source: Any
+    """What the event is about. Handlers can listen to a single source."""
+
+
+@dataclass(frozen=True)
+class Spawned(Event):
+    """An object was added to the state."""
+
+
+@dataclass(frozen=True)
+class Died(Event):
+    """An object died and was removed from the state."""
+
+
+@dataclass(frozen=True)
+class Hit(Event):
+    """An entity took damage."""
+
+    amount: float
+
+
+@dataclass(frozen=True)
+class StateChanged(Event):
+    """The current state changed. Sent to both the previous and the new state."""
+
+    operation: Any
+    previous: Any
+    current: Any
+
+
+E = TypeVar("E", bound=Event)
+Handler = Callable[[E], None]
+
+
+class EventBus:
+    """
+    Call the handlers subscribed to an event type when such an event is emitted.
+
+    Handlers are called immediately, in the order they subscribed.
+    A handler can listen to all the events of a type, or only to the
+    ones of a given source.
+    """
+
+    def __init__(self):
+        # source -> event type -> handlers. The source None means any source.
+        self.handlers: Dict[Any, Dict[Type[Event], List[Handler]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+
+    def subscribe(self, event_type: Type[E], handler: Handler, source=None):
+        """Call handler(event) on each event of the type, only from :source: if given.
+
+        Returns the handler, so this can be used as a decorator.
+        """
+        self.handlers[source][event_type].append(handler)
+        return handler
+
+    def unsubscribe(self, event_type: Type[Event], handler: Handler, source=None):
+        """Stop calling the handler. Does nothing if it was not subscribed."""
+
+        handlers = self.handlers.get(source, {}).get(event_type, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def forget(self, source):
+        """Remove all the handlers listening to the source, for instance when it died."""
+        self.handlers.pop(source, None)
+
+    def emit(self, event: Event):
+        for source in (event.source, None):
+            by_type = self.handlers.get(source)
+            if by_type:
+                # Copy, as handlers may unsubscribe
+                for handler in list(by_type.get(type(event), ())):
+                    handler(event)
@@ -1,14 +1,57 @@
 from contextlib import contextmanager
+from typing import Callable, List, Tuple
 
+import numpy as np
 import pygame
 import pygame.gfxdraw
 
-__all__ = ["GFX"]
+__all__ = ["GFX", "Command"]
+
+Command = Tuple[Callable, Tuple]
+"""A draw call recorded by the GFX, function(surf, *args)."""
+
+
+def draw_dots(surf: pygame.Surface, start, step, count, color):
+    """Set count pixels of surf, from start and each step further.
+
+    The positions are truncated like with int(), and only the ones in the clip are drawn.
+    """
+
+    i = np.arange(count)
+    xs = (start[0] + step[0] * i).astype(int)
+    ys = (start[1] + step[1] * i).astype(int)
+
+    clip = surf.get_clip()
+    visible = (
+        (clip.left <= xs) & (xs < clip.right) & (clip.top <= ys) & (ys < clip.bottom)
+    )
+
+    pixels = pygame.surfarray.pixels2d(surf)
+    pixels[xs[visible], ys[visible]] = surf.map_rgb(color)
+    del pixels  # Unlock the surface
 
 
 class GFX:
+    """
+    Record draw calls and run them on a surface.
+
+    Nothing is drawn before flush(), which runs all the calls since the last
+    flush in order, or before run() with the calls from take(). Consecutive
+    blits are merged into a single Surface.blits() and blits outside of the
+    clip are dropped when recorded.
+
+    Every draw goes through the GFX, never directly to its surf, so that the
+    order of the calls is kept. The commands keep no reference to what
+    changes in place between frames, like positions and colors, but the
+    surfaces they blit must not be drawn on until they ran.
+    """
+
     def __init__(self, surf: pygame.Surface):
         self.surf = surf
+        self.commands: List[Command] = []
+        """The draw calls since the last flush()."""
+        self.clip = surf.get_rect()
+        """Where the draw calls are visible, the clip of surf once they run."""
         self.world_center = pygame.Vector2(0, 0)
         """World coordinates that are in the center of the screen."""
         self.world_scale = 1
@@ -64,22 +107,66 @@ class GFX:
         anchor, value = anchor.popitem()
 
         s = self.scale_surf(surf, self.ui_scale)
-        r = s.get_rect(**{anchor: self.scale_ui_pos(*value)})
-        self.surf.blit(s, r)
+        self.blit(s, **{anchor: self.scale_ui_pos(*value)})
 
     def world_blit(self, surf, pos, size, anchor="topleft"):
         s = self.scale_surf(surf, vec2int(size * self.world_scale))
         r = s.get_rect(**{anchor: pos * self.world_scale})
         r.topleft -= self.world_center
-        self.surf.blit(s, r)
+        self.blit(s, topleft=r.topleft)
     '''
 
+    # Command buffer
+
+    def record(self, function: Callable, *args):
+        """Record a call to function(surf, *args), made at the next flush().
+
+        This is for the draw calls that the GFX has no method for. The
+        arguments are only read at the flush, so they must not change before.
+        """
+
+        self.commands.append((function, args))
+
+    def take(self) -> List[Command]:
+        """Return the draw calls recorded since the last flush, without running them.
+
+        They can then run() later, even in an other thread.
+        """
+
+        commands, self.commands = self.commands, []
+        return commands
+
+    def flush(self):
+        """Run the recorded draw calls on the surface."""
+
+        self.run(self.take())
+
+    def run(self, commands: List[Command]):
+        """Run draw calls returned by take() on the surface, in order."""
+
+        surf = self.surf
+        blit = pygame.Surface.blit
+        batch = []
+        for function, args in commands:
+            if function is blit:
+                batch.append(args)
+                continue
+
+            if batch:
+                surf.blits(batch, False)
+                batch = []
+            function(surf, *args)
+
+        if batch:
+            surf.blits(batch, False)
+
     def blit(self, surf, **anchor):
-        """Blit a surface directly on the underlying surface, coordinates are in pixels."""
+        """Blit a surface on the underlying surface, coordinates are in pixels."""
 
         r = surf.get_rect(**anchor)
         r.topleft += self.translation
-        self.surf.blit(surf, r)
+        if r.colliderect(self.clip):
+            self.commands.append((pygame.Surface.blit, (surf, r.topleft)))
 
         return r
 
@@ -94,12 +181,43 @@ class GFX:
 
         r.topleft += self.translation
 
-        pygame.draw.rect(self.surf, color, r, width)
+        self.record(pygame.draw.rect, color, r, width)
 
     def box(self, rect, color):
+        """Draw a filled rectangle, that can be transparent."""
         rect = pygame.Rect(rect)
         rect.topleft += self.translation
-        pygame.gfxdraw.box(self.surf, rect, color)
+        self.record(pygame.gfxdraw.box, rect, color)
+
+    def line(self, start, end, color, width=1):
+        t = self.translation
+        self.record(pygame.draw.line, color, t + start, t + end, width)
+
+    def lines(self, points, color, closed=False):
+        t = self.translation
+        self.record(pygame.draw.lines, color, closed, [t + p for p in points])
+
+    def circle(self, center, radius, color, width=0):
+        self.record(pygame.draw.circle, color, self.translation + center, radius, width)
+
+    def filled_circle(self, center, radius, color):
+        """Draw a filled circle, that can be transparent."""
+        x, y = self.translation + center
+        self.record(pygame.gfxdraw.filled_circle, int(x), int(y), radius, color)
+
+    def polygon(self, points, color):
+        """Draw a filled polygon, that can be transparent."""
+        t = self.translation
+        self.record(pygame.gfxdraw.filled_polygon, [t + p for p in points], color)
+
+    def pixel(self, pos, color):
+        x, y = self.translation + pos
+        self.record(pygame.Surface.set_at, (int(x), int(y)), color)
+
+    def dots(self, start, step, count, color):
+        """Draw a dotted line of count pixels, from start and each step further."""
+        t = self.translation
+        self.record(draw_dots, t + start, pygame.Vector2(step), count, color)
 
     def grid(self, surf, pos, blocks, steps, color=(255, 255, 255, 100)):
         """
@@ -122,10 +240,10 @@ class GFX:
             pygame.gfxdraw.line(surf, left, y, right, y, color)
 
     def fill(self, color):
-        self.surf.fill(color)
+        self.record(pygame.Surface.fill, color)
 
     def scroll(self, dx, dy):
-        self.surf.scroll(dx, dy)
+        self.record(pygame.Surface.scroll, dx, dy)
 
     @contextmanager
     def focus(self, rect):
@@ -135,10 +253,12 @@ class GFX:
 
         rect = pygame.Rect(rect)
 
-        previous_clip = self.surf.get_clip()
-        self.surf.set_clip(rect)
+        previous_clip = self.clip
+        self.record(pygame.Surface.set_clip, rect)
+        self.clip = rect.clip(self.surf.get_rect())
         self.translation = pygame.Vector2(rect.topleft)
         yield
-        self.surf.set_clip(previous_clip)
+        self.record(pygame.Surface.set_clip, previous_clip)
+        self.clip = previous_clip
         if previous_clip:
             self.translation = pygame.Vector2(previous_clip.topleft)
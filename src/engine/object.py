@@ -1,43 +1,228 @@
+from collections import defaultdict
 from random import gauss
-from typing import Optional, TYPE_CHECKING
+from typing import Any, Dict, Generator, List, Optional, TYPE_CHECKING, Tuple, Type
 
 import pygame
 
 from .gfx import GFX
 from .assets import font, rotate
 from .constants import GREEN, RED
+from .events import Died, Event, Hit
 from .particles import ImageParticle
 
 if TYPE_CHECKING:
-    from . import State
-
-__all__ = ["Object", "Entity", "SpriteObject", "Scriptable"]
+    from . import Collider, State
+
+__all__ = [
+    "Object",
+    "Entity",
+    "SpriteObject",
+    "Scriptable",
+    "Wait",
+    "Sleep",
+    "UntilDead",
+    "UntilExtinct",
+    "UntilEvent",
+]
 
 from .utils import overlay, random_in_rect, random_rainbow_color
 
 
+class Wait:
+    """
+    Yielded by a script to pause it until the wait is over.
+
+    While it waits, the script is parked: it is not resumed every frame,
+    and costs nothing until a timer or an event wakes it up.
+    A script can still yield anything else to wait for a single frame.
+    """
+
+    def __init__(self, timeout: Optional[int] = None):
+        """
+        Args:
+            timeout: maximum number of frames to wait, or None to wait forever.
+        """
+        self.timeout = timeout
+        self.wake = None
+        """Set by the Scriptable while the script is parked."""
+
+    def done(self) -> bool:
+        """Whether the wait is already over."""
+        return self.timeout is not None and self.timeout <= 0
+
+    def subscribe(self):
+        """Register the wait on the events that can end it."""
+
+    def notify(self) -> bool:
+        """Called on an event that might end the wait.
+
+        Returns whether the wait is over, so that events can forget about it.
+        """
+        if self.wake is not None and self.done():
+            self.expire()
+        return self.wake is None
+
+    def expire(self):
+        """Wake the script, even if the wait is not done."""
+        wake, self.wake = self.wake, None
+        if wake is not None:
+            wake()
+
+
+class Sleep(Wait):
+    """Wait for a given number of frames. Sleep(1) is the same as a bare yield."""
+
+    def __init__(self, frames: int):
+        super().__init__(frames)
+
+
+class UntilDead(Wait):
+    """Wait until all the objects are dead."""
+
+    def __init__(self, *objects: "Object", timeout=None):
+        super().__init__(timeout)
+        self.objects = objects
+
+    def done(self):
+        return super().done() or not any(o.alive for o in self.objects)
+
+    def subscribe(self):
+        for o in self.objects:
+            o.state.events.subscribe(Died, self.on_death, o)
+
+    def on_death(self, event: Died):
+        self.notify()
+
+    def expire(self):
+        super().expire()
+        # Also on timeout, as the objects might live much longer than the wait.
+        for o in self.objects:
+            if o.state is not None:
+                o.state.events.unsubscribe(Died, self.on_death, o)
+
+
+class UntilExtinct(Wait):
+    """Wait until there is no object of a given type alive in the state."""
+
+    def __init__(self, state: "State", type_: Type["Object"], timeout=None):
+        super().__init__(timeout)
+        self.state = state
+        self.type = type_
+
+    def done(self):
+        return super().done() or not any(
+            o.alive for o in self.state.get_all(self.type)
+        )
+
+    def subscribe(self):
+        self.state.events.subscribe(Died, self.on_death)
+
+    def on_death(self, event: Died):
+        if self.wake is None or isinstance(event.source, self.type) and self.notify():
+            self.state.events.unsubscribe(Died, self.on_death)
+
+
+class UntilEvent(Wait):
+    """Wait until one of the events is emitted, given as (event type, source) pairs."""
+
+    def __init__(self, state: "State", *events: Tuple[Type[Event], Any], timeout=None):
+        super().__init__(timeout)
+        self.state = state
+        self.events = events
+        self.happened = False
+
+    def done(self):
+        return super().done() or self.happened
+
+    def subscribe(self):
+        for event_type, source in self.events:
+            self.state.events.subscribe(event_type, self.on_event, source)
+
+    def on_event(self, event: Event):
+        self.happened = True
+        if self.notify():
+            for event_type, source in self.events:
+                self.state.events.unsubscribe(event_type, self.on_event, source)
+
+
 class Scriptable:
+    """
+    Something that runs generators, called scripts, one step per frame.
+
+    Scripts that yield a Wait are parked until the wait is over:
+    sleeping ones in timers indexed by frame, the others on the events
+    that can end their wait. Only the active scripts are resumed each frame.
+    """
+
+    TRANSIENT = ("scripts", "parked", "timers")
+    """Attributes that are not saved in snapshots. Generators cannot be saved."""
+
     def __init__(self):
         self.scripts = set()
+        self.frame = 0
+        self.parked: Dict[Generator, Wait] = {}
+        self.timers: Dict[int, List[Wait]] = defaultdict(list)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self.TRANSIENT:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.scripts = set()
+        self.parked = {}
+        self.timers = defaultdict(list)
 
     def add_script(self, generator):
         self.scripts.add(generator)
 
     def logic(self):
-        to_remove = set()
+        self.frame += 1
+        for wait in self.timers.pop(self.frame, ()):
+            wait.expire()
+
+        # Lists, as they are allocated for every object every frame and are
+        # almost always empty, which sets are not free for.
+        to_remove = []
+        to_park = []
         for script in self.scripts:
             try:
-                next(script)
+                wait = next(script)
             except StopIteration:
-                to_remove.add(script)
+                to_remove.append(script)
+            else:
+                if isinstance(wait, Wait):
+                    to_park.append((script, wait))
         self.scripts.difference_update(to_remove)
 
+        for script, wait in to_park:
+            self.park(script, wait)
+
+    def park(self, script, wait: Wait):
+        """Stop running the script until the wait is over."""
+
+        if wait.done():
+            return  # Resumed on the next frame
+
+        self.scripts.discard(script)
+        self.parked[script] = wait
+        wait.wake = lambda: self.wake(script)
+        if wait.timeout is not None:
+            self.timers[self.frame + wait.timeout].append(wait)
+        wait.subscribe()
+
+    def wake(self, script):
+        del self.parked[script]
+        self.scripts.add(script)
+
     def do_later(self, nb_of_frames):
         """Decorator to automatically call a function :nb_of_frames: later."""
 
         def decorator(func):
             def script():
-                yield from range(nb_of_frames)
+                yield Sleep(nb_of_frames)
                 func()
 
             self.add_script(script())
@@ -54,9 +239,11 @@ class Object(Scriptable):
         self.pos = pygame.Vector2(pos)
         self.size = pygame.Vector2(size)
         self.vel = pygame.Vector2(vel)
-        self.alive = True
+        self._alive = True
         self.scripts = {self.script()}
         self.state: Optional["State"] = None
+        self.colliders: List["Collider"] = []
+        """Colliders registered in the state's collision system when the object is added."""
 
         # A somewhat unique color per object, that can be used for debugging
         self._random_color = random_rainbow_color(80)
@@ -67,9 +254,29 @@ class Object(Scriptable):
     def script(self):
         yield
 
+    @property
+    def alive(self):
+        return self._alive
+
+    @alive.setter
+    def alive(self, value):
+        # The state removes the object at the end of the frame
+        if self._alive and not value and self.state is not None:
+            self.state.dying.append(self)
+        self._alive = value
+
+    def restore(self):
+        """Called after the object is loaded from a snapshot.
+
+        Scripts are not saved, so they start again from the beginning,
+        and should depend on the attributes of the object to resume
+        where they were. Override this to recreate what could not be saved.
+        """
+        self.scripts = {self.script()}
+
     def wait_until_dead(self):
-        while self.alive:
-            yield
+        if self.alive:
+            yield UntilDead(self)
 
     @property
     def center(self):
@@ -92,8 +299,10 @@ class Object(Scriptable):
 
         self.pos += self.vel
 
-        self.state.debug.rectangle(self.rect, self._random_color)
-        self.state.debug.vector(self.vel * 10, self.center, self._random_color)
+        debug = self.state.debug
+        if debug.enabled:
+            debug.rectangle(self.rect, self._random_color)
+            debug.vector(self.vel * 10, self.center, self._random_color)
 
     def draw(self, gfx: "GFX"):
         pass
@@ -159,7 +368,7 @@ class SpriteObject(Object):
 
     def draw(self, gfx: "GFX"):
         super().draw(gfx)
-        gfx.surf.blit(self.image, self.image.get_rect(center=self.sprite_center))
+        gfx.blit(self.image, center=self.sprite_center)
 
     @property
     def sprite_pos(self):
@@ -244,6 +453,10 @@ class Entity(SpriteObject):
         if self.life < 0:
             self.life = 0
 
+        if self.state is None:
+            return  # Not in a state yet, so nothing to notify nor show.
+        self.state.events.emit(Hit(self, amount))
+
         surf = font(20).render(str(int(amount)), False, RED)
 
         from src.engine import ImageParticle
@@ -270,10 +483,7 @@ class Entity(SpriteObject):
 
     def draw(self, gfx):
         if self.last_hit < 3:
-            gfx.surf.blit(
-                overlay(self.image, RED),
-                self.image.get_rect(center=self.sprite_center),
-            )
+            gfx.blit(overlay(self.image, RED), center=self.sprite_center)
             return
 
         if self.invincible and self.last_hit % 6 > 3:
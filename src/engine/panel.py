@@ -0,0 +1,96 @@
+from typing import Any, Callable, Hashable, List, TypeVar
+
+import pygame
+
+from .gfx import GFX
+
+__all__ = ["Panel", "Widget"]
+
+T = TypeVar("T", bound="Widget")
+
+_NOT_RENDERED = object()
+
+
+class Widget:
+    """A part of a Panel that is rendered only when the value it shows changes."""
+
+    def __init__(
+        self,
+        value: Callable[[], Hashable],
+        render: Callable[[Any], pygame.Surface],
+        **anchor,
+    ):
+        """
+        Args:
+            value: called every frame, returns what the widget displays.
+                It must be cheap to compute and comparable with ==.
+            render: called with the value when it changed, returns the surface to show.
+            anchor: position of the rendered surface in the panel, as in Surface.get_rect.
+        """
+        self.value = value
+        self.render = render
+        self.anchor = anchor or {"topleft": (0, 0)}
+
+        self.last_value = _NOT_RENDERED
+        self.surf: pygame.Surface = None
+
+    def invalidate(self):
+        """Force the widget to be rendered again on the next frame."""
+        self.last_value = _NOT_RENDERED
+
+    def update(self) -> bool:
+        """Render the widget if its value changed. Return whether it did."""
+
+        value = self.value()
+        if value == self.last_value:
+            return False
+
+        self.last_value = value
+        self.surf = self.render(value)
+        return True
+
+    def draw(self, surf: pygame.Surface):
+        surf.blit(self.surf, self.surf.get_rect(**self.anchor))
+
+
+class Panel:
+    """
+    A part of the screen that is drawn off-screen and only recomposed when one of its widgets changed.
+
+    Widgets are drawn in the order they were added, and
+    their anchors are relative to the topleft of the panel.
+    Pixels of the colorkey (black by default) are transparent.
+    """
+
+    def __init__(self, rect, colorkey=(0, 0, 0)):
+        self.rect = pygame.Rect(rect)
+        self.colorkey = colorkey
+        self.widgets: List[Widget] = []
+        self.surf = pygame.Surface(self.rect.size)
+        self.surf.set_colorkey(colorkey)
+        self.dirty = True
+
+    def add(self, widget: T) -> T:
+        self.widgets.append(widget)
+        self.dirty = True
+        return widget
+
+    def invalidate(self):
+        """Render again all the widgets on the next frame."""
+        for widget in self.widgets:
+            widget.invalidate()
+
+    def update(self):
+        """Render the widgets that changed and recompose the panel if needed."""
+
+        # No any(), every widget has to be checked, not only up to the first change.
+        changed = [widget.update() for widget in self.widgets]
+        if self.dirty or True in changed:
+            self.dirty = False
+            self.surf.fill(self.colorkey)
+            for widget in self.widgets:
+                widget.draw(self.surf)
+
+    def draw(self, gfx: GFX):
+        self.update()
+        gfx.blit(self.surf, topleft=self.rect.topleft)
@@ -4,7 +4,7 @@ from time import time
 from typing import Callable, Generic, Tuple, TypeVar, Union
 
 import pygame
-import pygame.gfxdraw as gfx
+import pygame.gfxdraw
 from pygame import Vector2
 
 
@@ -21,7 +21,14 @@ __all__ = [
     "ShardParticle",
 ]
 
-from src.engine.utils import bounce, exp_impulse, random_in_rect
+from src.engine.constants import SCREEN
+from src.engine.utils import (
+    bounce,
+    easing_table,
+    exp_impulse,
+    hsv_color,
+    random_in_rect,
+)
 
 pygame.init()
 
@@ -69,8 +76,36 @@ def rand2d(vec):
     return (uniform(0, vec[0]), uniform(0, vec[1]))
 
 
+# Curves of the animations, sampled with easing_table()
+
+
+def fade_curve(life_prop, fade_start):
+    if life_prop < fade_start:
+        return None
+    t = (life_prop - fade_start) / (1 - fade_start)
+    return int(255 * (1 - t))
+
+
+def blink_curve(life_prop, up_duration, pow):
+    if life_prop < up_duration:
+        a = life_prop / up_duration
+    else:
+        a = (1 - life_prop) / (1 - up_duration)
+    return int(255 * a ** pow)
+
+
+def gradient_curve(life_prop, h0, s0, v0, h1, s1, v1):
+    p = 1 - life_prop
+    h = int(p * h0 + life_prop * h1)
+    s = int(100 * (p * s0 + life_prop * s1))
+    v = int(100 * (p * v0 + life_prop * v1))
+    return hsv_color(h, s, v)
+
+
 class ParticleSystem(set):
     fountains: "List[ParticleFountain]"
+    AREA = SCREEN.inflate(200, 200)
+    """Particles that are drawn out of it are removed, see Particle.cull."""
 
     def __init__(self):
         super().__init__()
@@ -82,32 +117,56 @@ class ParticleSystem(set):
         for fountain in self.fountains:
             fountain.logic(self)
 
-        dead = set()
+        area = self.AREA
+        dead = []
         for particle in self:
             particle.logic()
             if not particle.alive:
-                dead.add(particle)
+                dead.append(particle)
+            elif (
+                particle.cull
+                and not area.collidepoint(particle.pos)
+                and not particle.draw_rect().colliderect(area)
+            ):
+                dead.append(particle)
 
         self.difference_update(dead)
 
-    def draw(self, surf: pygame.Surface):
+    def draw(self, gfx: "GFX"):
         """Draw all the particles"""
 
         for particle in self:
-            particle.draw(surf)
+            particle.draw(gfx)
 
     def add_fire_particle(self, pos, angle):
-        self.add(
-            SquareParticle()
-            .builder()
-            .at(pos, gauss(angle, 10))
-            .velocity(gauss(1, 0.1))
-            .sized(uniform(1, 5))
-            .living(30)
-            .hsv(gauss(20, 20), gauss(1, 0.1))
-            .anim_fade()
-            .build()
-        )
+        self.add_fire_particles(pos, pos, angle)
+
+    def add_fire_particles(self, start, end, angle, count=1):
+        """Add fire particles at random places of the segment from start to end.
+
+        The particles share their fade animation, which is only created once,
+        as lasers add some every frame they hit.
+        """
+
+        start = Vector2(start)
+        delta = Vector2(end) - start
+        fade = None
+        for _ in range(count):
+            builder = (
+                SquareParticle()
+                .builder()
+                .at(start + random() * delta, gauss(angle, 10))
+                .velocity(gauss(1, 0.1))
+                .sized(uniform(1, 5))
+                .living(30)
+                .hsv(gauss(20, 20), gauss(1, 0.1))
+            )
+            if fade is None:
+                particle = builder.anim_fade().build()
+                fade = particle.animations[0]
+            else:
+                particle = builder.anim(fade).build()
+            self.add(particle)
 
 
 class ParticleFountain:
@@ -142,6 +201,10 @@ class Particle:
         self.pos = Vector2(0, 0)
         self.speed = 3.0
         self.angle = -90
+        # Direction of the angle, updated only when the angle changes.
+        self._direction_angle = None
+        self._dx = 0.0
+        self._dy = 0.0
         self.acc = 0.0
         self.angle_vel = 0.0
         self.size = 10.0
@@ -153,8 +216,25 @@ class Particle:
         self.alpha = 255
 
         self.life_prop = 0.0
+        self.age = 0
+        """Number of frames lived, to index tables from easing_table()."""
         self.alive = True
         self.animations = []
+        self.cull = True
+        """Whether the particle is removed once it is drawn out of ParticleSystem.AREA.
+
+        Particles that turn, bounce or have a constant force may come back,
+        so the builder turns it off for them.
+        """
+
+    def reach(self) -> float:
+        """How far from its position the particle draws."""
+        return self.size
+
+    def draw_rect(self) -> pygame.Rect:
+        """A rect that contains everything the particle draws."""
+        r = self.reach()
+        return pygame.Rect(self.pos.x - r, self.pos.y - r, 2 * r, 2 * r)
 
     # Builder methods
 
@@ -187,12 +267,15 @@ class Particle:
             """
             self._p.speed = speed
             self._p.angle_vel = radial_velocity
+            if radial_velocity:
+                self._p.cull = False
             return self
 
         def constant_force(self, velocity: Vector2):
             """Add the given velocity to the particle's postion every frame."""
 
             self._p.constant_force = velocity
+            self._p.cull = False
             return self
 
         def acceleration(self, directional: float):
@@ -220,24 +303,32 @@ class Particle:
             self._p.animations.append(animation)
             return self
 
+        # The animations below look up their values in a table sampled once
+        # per lifespan, on their first frame, as the lifespan may be set after them.
+
         def anim_fade(self, fade_start=0):
+            table = None
+
             def fade(particle):
-                if particle.life_prop < fade_start:
-                    return
-                t = (particle.life_prop - fade_start) / (1 - fade_start)
-                alpha = int(255 * (1 - t))
-                particle.alpha = alpha
+                nonlocal table
+                if table is None:
+                    table = easing_table(fade_curve, particle.lifespan, fade_start)
+                alpha = table[particle.age]
+                if alpha is not None:
+                    particle.alpha = alpha
 
             return self.anim(fade)
 
         def anim_blink(self, up_duration=0.5, pow=2):
+            table = None
+
             def blink(particle):
-                if particle.life_prop < up_duration:
-                    a = particle.life_prop / up_duration
-                else:
-                    a = (1 - particle.life_prop) / (1 - up_duration)
-                # a = 1 - abs(1 - 2 * particle.life_prop)
-                particle.alpha = int(255 * a ** pow)
+                nonlocal table
+                if table is None:
+                    table = easing_table(
+                        blink_curve, particle.lifespan, up_duration, pow
+                    )
+                particle.alpha = table[particle.age]
 
             return self.anim(blink)
 
@@ -245,6 +336,7 @@ class Particle:
             """Make the particle bounce inside of the rectangle."""
 
             rect = pygame.Rect(rect)
+            self._p.cull = False
 
             def bounce_rect(particle):
                 angle = particle.angle % 360
@@ -273,19 +365,27 @@ class Particle:
 
         def anim_bounce_size(self, increase_duration=0.3, k=10):
             initial_size = self._p.size
+            table = None
 
             def bounce_size(particle):
-                particle.size = (
-                    bounce(particle.life_prop, increase_duration, k) * initial_size
-                )
+                nonlocal table
+                if table is None:
+                    table = easing_table(
+                        bounce, particle.lifespan, increase_duration, k
+                    )
+                particle.size = table[particle.age] * initial_size
 
             return self.anim(bounce_size)
 
         def anim_bounce_size_and_shrink(self, stretch=5):
             initial_size = self._p.size
+            table = None
 
             def bounce_size_and_shrink(particle):
-                particle.size = exp_impulse(particle.life_prop, stretch) * initial_size
+                nonlocal table
+                if table is None:
+                    table = easing_table(exp_impulse, particle.lifespan, stretch)
+                particle.size = table[particle.age] * initial_size
 
             return self.anim(bounce_size_and_shrink)
 
@@ -305,24 +405,40 @@ class Particle:
     def logic(self):
         """Update the attributes of the particle."""
 
+        self.age += 1
         self.life_prop += 1 / self.lifespan
         self.speed += self.acc
-        self.angle += self.angle_vel
-        self.pos += (
-            cos(self.angle * radians) * self.speed,
-            sin(self.angle * radians) * self.speed,
-        )
-        self.pos += self.constant_force
+        if self.angle_vel:
+            self.angle += self.angle_vel
+        # Animations may also change the angle
+        angle = self.angle
+        if angle != self._direction_angle:
+            self._direction_angle = angle
+            self._dx = cos(angle * radians)
+            self._dy = sin(angle * radians)
+
+        # In place, this runs for thousands of particles each frame.
+        speed = self.speed
+        pos = self.pos
+        pos.x += self._dx * speed
+        pos.y += self._dy * speed
+        if self.constant_force:
+            pos += self.constant_force
 
         self.inner_rotation += self.inner_rotation_speed
 
         if self.speed < 0 or self.size <= 0 or self.life_prop >= 1:
             self.alive = False
-        else:
+        elif self.animations:
             for anim in self.animations:
                 anim(self)
 
-    def draw(self, surf):
+    def draw(self, gfx: "GFX"):
+        """Record the draw calls of the particle.
+
+        They may run after the next logic(), so they must not keep references
+        to what it changes in place, like the position or the color.
+        """
         raise NotImplementedError()
 
 
@@ -344,7 +460,7 @@ class DrawnParticle(Particle):
             hue = round(hue) % 360
             saturation = clamp(0, 100, round(100 * saturation))
             value = clamp(0, 100, round(100 * value))
-            self._p.color.hsva = (hue, saturation, value, 100)
+            self._p.color.update(hsv_color(hue, saturation, value))
             return self
 
         def anim_gradient_to(self, h0, s0, v0, h1, v1, s1):
@@ -358,15 +474,18 @@ class DrawnParticle(Particle):
             # s1 = clamp(s) * 100 if s is not None else s0
             # v1 = clamp(v) * 100 if v is not None else v0
 
-            def gradient_to(particle):
-                p = 1 - particle.life_prop
-                t = particle.life_prop
+            # The colors are baked in a palette, indexed by the age of the particle.
+            # Hues are rounded, so that similar gradients share their palette.
+            h0, h1 = round(h0), round(h1)
+            palette = None
 
-                h = int(p * h0 + t * h1) % 360
-                s = int(100 * (p * s0 + t * s1))
-                v = int(100 * (p * v0 + t * v1))
-                r = h, s, v, 100
-                particle.color.hsva = r
+            def gradient_to(particle):
+                nonlocal palette
+                if palette is None:
+                    palette = easing_table(
+                        gradient_curve, particle.lifespan, h0, s0, v0, h1, s1, v1
+                    )
+                particle.color.update(palette[particle.age])
 
             return self.anim(gradient_to)
 
@@ -380,28 +499,26 @@ class CircleParticle(DrawnParticle):
         super().__init__(color)
         self.filled = filled
 
-    def draw(self, surf):
+    def draw(self, gfx: "GFX"):
+        color = tuple(self.color)
         if self.color.a < 255:
             if self.filled:
-                gfx.filled_circle(
-                    surf, int(self.pos.x), int(self.pos.y), int(self.size), self.color
-                )
+                gfx.filled_circle(self.pos, int(self.size), color)
             else:
-                gfx.circle(
-                    surf, int(self.pos.x), int(self.pos.y), int(self.size), self.color
-                )
+                x, y = gfx.translation + self.pos
+                gfx.record(pygame.gfxdraw.circle, int(x), int(y), int(self.size), color)
 
         else:
-            pygame.draw.circle(surf, self.color, self.pos, self.size, 1 - self.filled)
+            gfx.circle(self.pos, self.size, color, 1 - self.filled)
 
 
 class SquareParticle(DrawnParticle):
-    def draw(self, surf):
+    def draw(self, gfx: "GFX"):
         pos = self.pos - (self.size / 2, self.size / 2)
         if self.color.a < 255:
-            gfx.box(surf, (pos, (self.size, self.size)), self.color)
+            gfx.box((pos, (self.size, self.size)), tuple(self.color))
         else:
-            pygame.draw.rect(surf, self.color, (pos, (self.size, self.size)))
+            gfx.rect(*pos, self.size, self.size, tuple(self.color))
 
 
 class PolygonParticle(DrawnParticle):
@@ -422,7 +539,7 @@ class PolygonParticle(DrawnParticle):
         self.vertex_step = vertex_step
         self.vertices = vertices
 
-    def draw(self, surf):
+    def draw(self, gfx: "GFX"):
         points = [
             self.pos
             + polar(
@@ -432,7 +549,7 @@ class PolygonParticle(DrawnParticle):
             for i in range(self.vertices)
         ]
 
-        gfx.filled_polygon(surf, points, self.color)
+        gfx.polygon(points, tuple(self.color))
 
 
 class ShardParticle(DrawnParticle):
@@ -448,7 +565,10 @@ class ShardParticle(DrawnParticle):
         self.tail = tail
         self.head = head
 
-    def draw(self, surf):
+    def reach(self):
+        return self.size * max(1, self.head, self.tail)
+
+    def draw(self, gfx: "GFX"):
         vel = polar(self.speed, self.angle)
         vel.scale_to_length(self.size)
         cross = Vector2(-vel.y, vel.x)
@@ -460,7 +580,7 @@ class ShardParticle(DrawnParticle):
             self.pos - cross,
         ]
 
-        gfx.filled_polygon(surf, points, self.color)
+        gfx.polygon(points, tuple(self.color))
 
 
 class LineParticle(DrawnParticle):
@@ -469,10 +589,13 @@ class LineParticle(DrawnParticle):
         self.width = width
         super().__init__(color)
 
-    def draw(self, surf):
-        end = vec2int(self.pos - polar(self.length, self.angle))
-        start = vec2int(self.pos)
-        gfx.line(surf, *start, *end, self.color)
+    def reach(self):
+        return self.length
+
+    def draw(self, gfx: "GFX"):
+        end = vec2int(gfx.translation + self.pos - polar(self.length, self.angle))
+        start = vec2int(gfx.translation + self.pos)
+        gfx.record(pygame.gfxdraw.line, *start, *end, tuple(self.color))
 
 
 class ImageParticle(Particle):
@@ -492,8 +615,8 @@ class ImageParticle(Particle):
 
     @alpha.setter
     def alpha(self, value: int):
+        # Set on the surf in draw(), as the last frame may still be drawing it.
         self._alpha = value
-        self.surf.set_alpha(value)
 
     def redraw(self):
         self.need_redraw = False
@@ -506,11 +629,19 @@ class ImageParticle(Particle):
         surf.set_alpha(self.alpha)
         return surf
 
-    def draw(self, surf: pygame.Surface):
+    def draw_rect(self):
+        w, h = self.original_surf.get_size()
+        ratio = self.size / min(w, h)
+        rect = pygame.Rect(0, 0, w * ratio, h * ratio)
+        rect.center = self.pos
+        return rect
+
+    def draw(self, gfx: "GFX"):
         if self.need_redraw:
             self.surf = self.redraw()
+        self.surf.set_alpha(self._alpha)
 
-        surf.blit(self.surf, self.surf.get_rect(center=self.pos))
+        gfx.blit(self.surf, center=self.pos)
 
     def logic(self):
         last_size = self.size
@@ -0,0 +1,126 @@
+import atexit
+import os
+import tempfile
+import threading
+import traceback
+from pathlib import Path
+from time import monotonic
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+__all__ = ["BackgroundWriter", "writer", "atomic_write", "atomic_write_bytes"]
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """Write the data to a temporary file, then rename it to path.
+
+    The file is then always either the old or the new version, never half written.
+    The temporary file has a unique name, so that other programs writing to the
+    same path, like a second copy of the game, do not replace it mid-write.
+    """
+
+    fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        # mkstemp makes it private, the file keeps its permissions instead.
+        os.chmod(temporary, path.stat().st_mode if path.exists() else 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+
+def atomic_write(path: Path, text: str):
+    """Write the text to path, see atomic_write_bytes."""
+
+    atomic_write_bytes(path, text.encode())
+
+
+class BackgroundWriter:
+    """
+    Write to the disk in a thread, so that slow disks never stall a frame.
+
+    Writes wait DELAY seconds before they run, and a write replaces the
+    one waiting with the same key. Many changes in a short time are then
+    written only once, with their last value. Everything waiting is
+    written by flush(), which also runs when the program exits.
+    """
+
+    DELAY = 1.0
+
+    def __init__(self):
+        self._pending: Dict[Hashable, Tuple[float, Callable[[], None]]] = {}
+        """The jobs waiting, with the time they are due."""
+        self._lock = threading.Condition()
+        self._running = threading.Lock()
+        """Held while writing, so that flush() waits for the writes in progress."""
+        self._thread: Optional[threading.Thread] = None
+
+    def write(
+        self, job: Callable[[], None], key: Hashable = None, delay: float = None
+    ):
+        """Call job in the background, or the last job written with the same key.
+
+        Jobs without key are never replaced. The job waits delay seconds,
+        DELAY by default, and 0 to run it as soon as possible.
+        """
+
+        if key is None:
+            key = object()
+        if delay is None:
+            delay = self.DELAY
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.flush)
+
+            self._pending[key] = (monotonic() + delay, job)
+            self._lock.notify()
+
+    def flush(self):
+        """Run all the writes now, and wait for them to be done.
+
+        This includes the writes that the jobs ask for while they run.
+        """
+
+        with self._running:
+            while self._pending:
+                self._write_pending(float("inf"))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # Sleep until the first job is due. New jobs wake us up to check again.
+                while True:
+                    now = monotonic()
+                    due = min((due for due, _ in self._pending.values()), default=None)
+                    if due is not None and due <= now:
+                        break
+                    self._lock.wait(None if due is None else due - now)
+
+            with self._running:
+                self._write_pending(now)
+
+    def _write_pending(self, now: float):
+        """Run the jobs due at the time now."""
+
+        with self._lock:
+            jobs = [job for due, job in self._pending.values() if due <= now]
+            self._pending = {
+                key: (due, job)
+                for key, (due, job) in self._pending.items()
+                if due > now
+            }
+
+        for job in jobs:
+            try:
+                job()
+            except Exception:
+                traceback.print_exc()
+
+
+writer = BackgroundWriter()
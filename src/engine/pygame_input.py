@@ -1,6 +1,6 @@
 import time as _time
 from dataclasses import dataclass
-from typing import Dict, Union, Set
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 import pygame
 
@@ -34,9 +34,32 @@ def clamp(x, mini, maxi):
     return x
 
 
+Route = Tuple
+"""Identify the events of a key, button or axis, see event_route()."""
+
+
+def event_route(event) -> Route:
+    """Which key, button or axis the event is about.
+
+    Inputs match the events with the same route, whether they are presses or releases.
+    """
+
+    type_ = event.type
+    if type_ == pygame.KEYDOWN or type_ == pygame.KEYUP:
+        return pygame.KEYDOWN, event.key
+    if type_ == pygame.JOYAXISMOTION:
+        return pygame.JOYAXISMOTION, event.joy, event.axis
+    if type_ == pygame.JOYBUTTONDOWN or type_ == pygame.JOYBUTTONUP:
+        return pygame.JOYBUTTONDOWN, event.joy, event.button
+    return (type_,)
+
+
 class ButtonInput:
     """Base class for all boolean/button inputs."""
 
+    route: Optional[Route] = None
+    """The route of all the events that match, None to check each event with match()."""
+
     def match(self, event) -> bool:
         """
         Whether the event corresponds to this button.
@@ -62,6 +85,10 @@ class KeyPress(ButtonInput):
 
     key: int
 
+    @property
+    def route(self):
+        return pygame.KEYDOWN, self.key
+
     def match(self, event):
         """Whether the event corresponds to this key press or release."""
         return event.type in (pygame.KEYDOWN, pygame.KEYUP) and event.key == self.key
@@ -78,6 +105,10 @@ class JoyButton(ButtonInput):
     button: int
     joy_id: int = 0
 
+    @property
+    def route(self):
+        return pygame.JOYBUTTONDOWN, self.joy_id, self.button
+
     def match(self, event):
         """Whether the event corresponds to this button."""
         return (
@@ -110,6 +141,10 @@ class JoyAxisTrigger(ButtonInput):
     joy_id: int = 0
     """The id used to initialise the joystick."""
 
+    @property
+    def route(self):
+        return pygame.JOYAXISMOTION, self.joy_id, self.axis
+
     def match(self, event) -> bool:
         """Whether the event corresponds to this button."""
         return (
@@ -124,6 +159,8 @@ class JoyAxisTrigger(ButtonInput):
 
 
 class QuitEvent(ButtonInput):
+    route = (pygame.QUIT,)
+
     def match(self, event) -> bool:
         return event.type == pygame.QUIT
 
@@ -143,6 +180,10 @@ class JoyAxis:
     joy_id: int = 0
     """The id used to initialise the joystick."""
 
+    @property
+    def route(self):
+        return pygame.JOYAXISMOTION, self.joy_id, self.axis
+
     def match(self, event):
         """Whether the event corresponds to this axis."""
 
@@ -184,6 +225,9 @@ class Button:
             KeyPress(key) if isinstance(key, int) else key for key in keys
         }
         self._pressed = {}
+        self._nb_pressed = 0
+        """Number of keys pressed, the number of True in _pressed."""
+        self._was_pressed = False
         self.just_released = False
         self.just_pressed = False
         self.just_double_pressed = False
@@ -238,17 +282,37 @@ class Button:
                     c.callback(self)
 
     def actualise(self, events):
+        self.start_frame()
+        for event in events:
+            for key in self._keys:
+                if key.match(event):
+                    self.handle(key, event)
+        self.end_frame()
+
+    def sources(self):
+        """The keys, buttons and axis that this input listens to."""
+        return self._keys
+
+    def start_frame(self):
+        """Prepare for the events of a frame, passed to handle()."""
+
         self.just_pressed = False
         self.just_double_pressed = False
         self.just_released = False
+        self._was_pressed = self.pressed
 
-        old_pressed = self.pressed
-        for event in events:
-            for key in self._keys:
-                if key.match(event):
-                    self._pressed[key] = key.pressed(event)
+    def handle(self, key: ButtonInput, event):
+        """Take into account an event that matches one of the keys."""
 
-        if not old_pressed:
+        pressed = key.pressed(event)
+        if pressed != self._pressed.get(key, False):
+            self._nb_pressed += 1 if pressed else -1
+        self._pressed[key] = pressed
+
+    def end_frame(self):
+        """Update the state of the button after the events of the frame."""
+
+        if not self._was_pressed:
             if self.pressed:
                 self.press_time = 0
                 self.just_pressed = True
@@ -265,7 +329,7 @@ class Button:
     @property
     def pressed(self):
         """Whether the button is actually pressed."""
-        return sum(self._pressed.values(), 0) > 0
+        return self._nb_pressed > 0
 
     @property
     def double_pressed(self):
@@ -337,8 +401,10 @@ class Axis:
         self.non_zero_time = 0
         self.zero_time = 0
 
-        # Hold the number of keys pressed
+        # Hold the number of keys pressed, positive minus negative
         self._int_value = 0
+        # The most extreme value of the axis during this frame, if any moved
+        self._frame_axis_value: Optional[float] = None
         # Hold the smoothed number of keys pressed
         self._value = 0
         # Hold the total value of axis,
@@ -392,27 +458,43 @@ class Axis:
             c(self)
 
     def actualise(self, events):
-        axis_value = 0
-        any_axis = False
+        self.start_frame()
         for event in events:
-            for pos in self._positive:
-                if pos.match(event):
-                    self._positive[pos] = pos.pressed(event)
-            for neg in self._negative:
-                if neg.match(event):
-                    self._negative[neg] = neg.pressed(event)
-
-            for axis in self._axis:
-                if axis.match(event):
-                    # We take the most extreme value
-                    val = axis.value(event)
-                    if abs(val) > abs(axis_value):
-                        axis_value = val
-                    any_axis = True
-
-        self._int_value = sum(self._positive.values()) - sum(self._negative.values())
-        if any_axis:
-            self._axis_value = axis_value
+            for source in self.sources():
+                if source.match(event):
+                    self.handle(source, event)
+        self.end_frame()
+
+    def sources(self):
+        """The keys and axis that this input listens to."""
+        return [*self._positive, *self._negative, *self._axis]
+
+    def start_frame(self):
+        """Prepare for the events of a frame, passed to handle()."""
+        self._frame_axis_value = None
+
+    def handle(self, source: Union[KeyPress, JoyAxis], event):
+        """Take into account an event that matches one of the sources()."""
+
+        if source in self._axis:
+            # We take the most extreme value
+            val = source.value(event)
+            current = self._frame_axis_value
+            if current is None or abs(val) > abs(current):
+                self._frame_axis_value = val
+            return
+
+        for keys, sign in ((self._positive, 1), (self._negative, -1)):
+            if source in keys:
+                pressed = source.pressed(event)
+                if pressed != keys[source]:
+                    self._int_value += sign if pressed else -sign
+                keys[source] = pressed
+
+    def end_frame(self):
+        """Update the value of the axis after the events of the frame."""
+        if self._frame_axis_value is not None:
+            self._axis_value = self._frame_axis_value
 
 
 class Inputs(dict, Dict[str, Union[Button, Axis]]):
@@ -420,12 +502,61 @@ class Inputs(dict, Dict[str, Union[Button, Axis]]):
         super().__init__()
         self._last_time = _time.time()
 
+        self._indexed: Tuple[Union[Button, Axis], ...] = ()
+        """The inputs when the index was built, to rebuild it when they change."""
+        self._routed: List[Union[Button, Axis]] = []
+        """The inputs with sources(), that get their events from the index."""
+        self._actualised = []
+        """Other inputs, that only have actualise() and get all the events."""
+        self._index: Dict[Route, List[Tuple[Union[Button, Axis], object]]] = {}
+        """The inputs and their source that match the events of each route."""
+        self._unrouted: List[Tuple[Union[Button, Axis], ButtonInput]] = []
+        """The sources without a route, that are checked against every event."""
+
+    def _update_index(self):
+        inputs = tuple(self.values())
+        if inputs == self._indexed:
+            return
+
+        self._indexed = inputs
+        self._routed = []
+        self._actualised = []
+        self._index = {}
+        self._unrouted = []
+        for inp in inputs:
+            if not hasattr(inp, "sources"):
+                self._actualised.append(inp)
+                continue
+
+            self._routed.append(inp)
+            for source in inp.sources():
+                if source.route is None:
+                    self._unrouted.append((inp, source))
+                else:
+                    self._index.setdefault(source.route, []).append((inp, source))
+
     def trigger(self, events):
         """Trigger all callbacks when needed"""
 
         # make sure we can iterate it multiple times
         events = list(events)
-        for inp in self.values():
+        self._update_index()
+
+        for inp in self._routed:
+            inp.start_frame()
+
+        # Each event goes only to the inputs that listen to its key, button or axis.
+        index = self._index
+        for event in events:
+            for inp, source in index.get(event_route(event), ()):
+                inp.handle(source, event)
+            for inp, source in self._unrouted:
+                if source.match(event):
+                    inp.handle(source, event)
+
+        for inp in self._routed:
+            inp.end_frame()
+        for inp in self._actualised:
             inp.actualise(events)
 
         dt = _time.time() - self._last_time
@@ -0,0 +1,198 @@
+import sqlite3
+import threading
+from bisect import bisect_right
+from pathlib import Path
+from time import time
+from typing import List, Optional, Tuple
+
+__all__ = ["ScoreStore", "scores"]
+
+from .constants import ASSETS_DIR
+from .persistence import writer
+from .settings import settings
+
+
+class ScoreStore:
+    """
+    All the scores ever made on this machine, in an SQLite database.
+
+    Adding a score is a single insert, in a transaction, so the file is
+    never left half written. The database is only used by the writer
+    thread: it is opened by load(), at startup, and the highscores that
+    used to be kept in the settings are moved in it then. A new database
+    starts with the DEFAULT_SCORES instead. The best scores are kept in
+    memory, so top() never waits for the disk.
+    """
+
+    PATH = ASSETS_DIR / "scores.sqlite"
+    CACHED = 100
+    """How many of the best scores are kept in memory, the most top() can give."""
+    DEFAULT_SCORES = [(15000, "CozyFractal"), (8900, "Félix"), (1700, "mineit!")]
+    """The scores to beat in a new database."""
+
+    def __init__(self, path: Path = PATH):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._best: Optional[List[Tuple[int, str]]] = None
+        """The CACHED best scores, best first, or None until loaded."""
+        self._pending: List[Tuple[int, str]] = []
+        """The scores added before the best ones were loaded."""
+        self._count = 0
+        self._created = False
+        """Whether the database was created when it was opened."""
+        self._migrated = False
+        self._lock = threading.Lock()
+        """For the scores in memory. Never held while using the database."""
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The database, opened on first use. Only for the writer thread."""
+
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._created = not self._connection.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'scores'"
+            ).fetchone()
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS scores ("
+                    "id INTEGER PRIMARY KEY, score INTEGER, name TEXT, time REAL)"
+                )
+                self._connection.execute(
+                    "CREATE INDEX IF NOT EXISTS best ON scores (score DESC, id)"
+                )
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)"
+                )
+        return self._connection
+
+    def load(self):
+        """Open the database and read the best scores, right away in the background."""
+
+        # The settings are loaded here, so that only this thread changes them.
+        old = getattr(settings, "highscores", None)
+        writer.write(lambda: self._load(old), delay=0)
+
+    def _load(self, old: Optional[List[Tuple[int, str]]]):
+        new = self._migrate(old)
+
+        with self._lock:
+            if self._best is not None:
+                # An insert needed the best scores first, without the new ones.
+                for entry in new:
+                    self._remember(entry)
+                self._count += len(new)
+                return
+
+        self._load_best()
+
+    def _load_best(self):
+        best = self.connection.execute(
+            "SELECT score, name FROM scores ORDER BY score DESC, id LIMIT ?",
+            (self.CACHED,),
+        ).fetchall()
+        count = self.connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+        with self._lock:
+            self._best = best
+            for entry in self._pending:
+                self._remember(entry)
+            self._pending.clear()
+            self._count += count
+
+    def _migrate(self, old: Optional[List[Tuple[int, str]]]) -> List[Tuple[int, str]]:
+        """Fill a new database with the default scores, or with the old highscores.
+
+        The highscores of older versions were in the settings. They are
+        imported only once, and removed from the settings only once they
+        are in the database. Returns the scores that were inserted.
+        """
+
+        if self._migrated:
+            return []
+        self._migrated = True
+
+        connection = self.connection  # Sets _created
+        new = []
+        if old is not None:
+            imported = connection.execute(
+                "SELECT value FROM meta WHERE key = 'imported_settings'"
+            ).fetchone()
+            if not imported:
+                # Older versions started with the default scores too, they are in there.
+                new = [(score, name) for score, name in old]
+                with connection:
+                    connection.execute(
+                        "INSERT INTO meta (key, value) VALUES ('imported_settings', 1)"
+                    )
+                    self._insert_all(new)
+
+            del settings.highscores
+            settings.save()
+        elif self._created:
+            new = list(self.DEFAULT_SCORES)
+            with connection:
+                self._insert_all(new)
+
+        return new
+
+    def _insert_all(self, entries: List[Tuple[int, str]]):
+        self.connection.executemany(
+            "INSERT INTO scores (score, name, time) VALUES (?, ?, 0)", entries
+        )
+
+    def add(self, score: int, name: str):
+        """Save a new score, in the background."""
+
+        entry = (score, name)
+        with self._lock:
+            if self._best is None:
+                self._pending.append(entry)
+            else:
+                self._remember(entry)
+            self._count += 1
+        writer.write(lambda when=time(): self._insert(entry, when))
+
+    def _remember(self, entry: Tuple[int, str]):
+        # After the equal scores, as it is the newest.
+        index = bisect_right([-score for score, _ in self._best], -entry[0])
+        self._best.insert(index, entry)
+        del self._best[self.CACHED :]
+
+    def _insert(self, entry: Tuple[int, str], when: float):
+        if self._best is None:
+            # Before load() reads them, it would also read this score.
+            self._load_best()
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO scores (score, name, time) VALUES (?, ?, ?)",
+                (*entry, when),
+            )
+
+    def top(self, n: int) -> List[Tuple[int, str]]:
+        """The n best (score, name), best first. The oldest first for equal scores.
+
+        Until the database is loaded, only the scores added since the start are known.
+        """
+
+        with self._lock:
+            if self._best is None:
+                # The sort is stable, so equal scores stay in the order they were added.
+                return sorted(self._pending, key=lambda entry: -entry[0])[:n]
+            return self._best[:n]
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    def close(self):
+        """Close the database, once all the writes are done."""
+
+        writer.flush()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+scores = ScoreStore()
@@ -1,25 +1,148 @@
-from typing import Tuple
+from typing import List, Optional, Tuple
 
+import numpy as np
 import pygame
+from pygame._sdl2.video import Renderer, Texture, Window
+
+from .constants import GAME_NAME
 
 
 __all__ = [
+    "FrameDiff",
+    "Upscaler",
+    "NumpyUpscaler",
     "Screen",
     "FixedScreen",
     "FreeScreen",
     "BlackBordersScreen",
     "IntegerScaleScreen",
     "ExtendFieldOfViewScreen",
+    "RendererScreen",
 ]
 
 
+class FrameDiff:
+    """
+    Find the parts of a surface that changed since the last frame.
+
+    The surface is cut in square tiles and the changed tiles of each row
+    are merged into rectangles. When too much changed, it is faster
+    to update everything, so changed() returns None.
+    """
+
+    TILE = 16
+    MAX_DIRTY = 0.5
+    """Proportion of changed tiles above which everything is updated."""
+
+    def __init__(self):
+        self.previous: Optional[np.ndarray] = None
+
+    def reset(self):
+        """Forget the last frame, for instance when it was not shown."""
+        self.previous = None
+
+    def changed(self, surf: pygame.Surface) -> Optional[List[pygame.Rect]]:
+        """Return the rects of surf that changed since the last call, or None for all of it."""
+
+        pixels = pygame.surfarray.array2d(surf)
+        previous, self.previous = self.previous, pixels
+        if previous is None or previous.shape != pixels.shape:
+            return None
+
+        t = self.TILE
+        w, h = pixels.shape
+        changed = np.zeros((-(-w // t) * t, -(-h // t) * t), dtype=bool)
+        changed[:w, :h] = pixels != previous
+        tiles = changed.reshape(changed.shape[0] // t, t, -1, t).any(axis=(1, 3))
+
+        if tiles.mean() > self.MAX_DIRTY:
+            return None
+
+        rects = []
+        for y in range(tiles.shape[1]):
+            # Start and end of the runs of changed tiles in the row
+            row = np.diff(tiles[:, y].astype(np.int8), prepend=0, append=0)
+            for start, end in zip(np.flatnonzero(row == 1), np.flatnonzero(row == -1)):
+                rects.append(
+                    pygame.Rect(start * t, y * t, (end - start) * t, t).clip(
+                        0, 0, w, h
+                    )
+                )
+        return rects
+
+
+class Upscaler:
+    """Scale the draw surface to the window, with pygame.transform.scale."""
+
+    def scale(self, surf: pygame.Surface, dest: pygame.Surface):
+        """Scale surf to the size of dest, into dest."""
+
+        if surf.get_size() == dest.get_size():
+            dest.blit(surf, (0, 0))
+        else:
+            pygame.transform.scale(surf, dest.get_size(), dest)
+
+
+class NumpyUpscaler(Upscaler):
+    """
+    Nearest neighbour upscaling by an integer factor, with numpy.
+
+    Each row of the surface is widened once into a buffer, which is then
+    copied to the k rows of dest it covers. Rows are
+    contiguous in memory, so this is faster than pygame for large factors.
+    Other sizes, factors below MIN_FACTOR and different pixel formats use pygame.
+    The buffer only grows, so that scaling the dirty rects of a frame, all
+    of different sizes, reuses it.
+    """
+
+    MIN_FACTOR = 3
+
+    def __init__(self):
+        self.buffer = np.empty((0, 0), dtype=np.uint32)
+
+    def scale(self, surf: pygame.Surface, dest: pygame.Surface):
+        w, h = surf.get_size()
+        dw, dh = dest.get_size()
+        k = dw // w
+        if (
+            k < self.MIN_FACTOR
+            or dw != k * w
+            or dh != k * h
+            or surf.get_bytesize() != 4
+            or surf.get_masks() != dest.get_masks()
+        ):
+            return super().scale(surf, dest)
+
+        src = pygame.surfarray.pixels2d(surf)
+        pixels = pygame.surfarray.pixels2d(dest)
+        bw, bh = self.buffer.shape
+        if bw < dw or bh < h or self.buffer.dtype != src.dtype:
+            # Same layout as the surfaces, with the x axis contiguous
+            self.buffer = np.empty((max(bw, dw), max(bh, h)), src.dtype, order="F")
+        buffer = self.buffer[:dw, :h]
+        for column in range(k):
+            buffer[column::k] = src
+        for row in range(k):
+            pixels[:, row::k] = buffer
+        del src, pixels  # Unlock the surfaces
+
+
 class Screen:
     FLAGS = pygame.RESIZABLE
+    PIPELINE = True
+    """Whether update_window() can run in the presenter thread of a pipelined App.
+
+    Otherwise, it runs on the main thread once the frame is drawn.
+    """
 
     draw_surface: pygame.Surface
     window_size: Tuple[int, int]
     window: pygame.Surface
 
+    def __init__(self):
+        self.upscaler: Upscaler = NumpyUpscaler()
+        """How the draw_surface is scaled to the window, if it is. Not shared."""
+
     def resize(self, new_size=None):
         self.window = pygame.display.set_mode(new_size or self.window_size, self.FLAGS)
         self.window_size = (
@@ -27,9 +150,50 @@ class Screen:
         )  # We don't always get the size asked for.
         self.draw_surface = self.window
 
-    def update_window(self):
+    def update_window(self, rects: Optional[List[pygame.Rect]] = None):
         """Transfer the contents of the draw_surface to the window.
-         Called every frame before pygame.display.flip()."""
+         Called every frame before pygame.display.flip().
+
+        Args:
+            rects: the parts of the draw_surface to transfer, or None for everything.
+
+        Returns:
+            The parts of the window that changed, or None for all of it.
+        """
+        return rects
+
+    def show(self, window_rects: Optional[List[pygame.Rect]] = None):
+        """Update the given parts of the window on the display, or all of it."""
+
+        if window_rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(window_rects)
+
+    def present(self, rects: Optional[List[pygame.Rect]] = None):
+        """Show the draw_surface on the window, only the given rects if any."""
+
+        self.show(self.update_window(rects))
+
+    def _scale_rects(self, rects, scale):
+        """Scale the rects of the draw_surface to the scaled_draw_rect of the window.
+
+        The scale must be an integer, so that each part scales the same as the whole.
+        """
+
+        window_rects = []
+        for rect in rects:
+            scaled = pygame.Rect(
+                self.scaled_draw_rect.x + rect.x * scale,
+                self.scaled_draw_rect.y + rect.y * scale,
+                rect.w * scale,
+                rect.h * scale,
+            )
+            self.upscaler.scale(
+                self.draw_surface.subsurface(rect), self.window.subsurface(scaled)
+            )
+            window_rects.append(scaled)
+        return window_rects
 
     def fixup_mouse_input(self, event):
         """Fix the mouse events to take any resizing into account."""
@@ -42,6 +206,7 @@ class FixedScreen(Screen):
     FLAGS = 0
 
     def __init__(self, size):
+        super().__init__()
         self.window_size = size
 
     def resize(self, new_size=None):
@@ -50,6 +215,7 @@ class FixedScreen(Screen):
 
 class FreeScreen(Screen):
     def __init__(self, size=None):
+        super().__init__()
         self.window_size = size or pygame.display.list_modes()[0]
         self.resize()
 
@@ -58,6 +224,7 @@ class IntegerScaleScreen(Screen):
     FLAGS = pygame.SCALED | pygame.RESIZABLE
 
     def __init__(self, design_size):
+        super().__init__()
         self.design_size = design_size
         self.window = pygame.display.set_mode(self.design_size, self.FLAGS)
         self.window_size = self.window.get_size()
@@ -69,6 +236,7 @@ class IntegerScaleScreen(Screen):
 
 class BlackBordersScreen(Screen):
     def __init__(self, design_size, border_color="black"):
+        super().__init__()
         self.border_color = border_color
         self.design_size = pygame.Vector2(design_size)
         self.window_size = self._biggest_screen_available()
@@ -96,11 +264,13 @@ class BlackBordersScreen(Screen):
 
         print(self.scaled_draw_rect, self.window)
 
-    def update_window(self):
+    def update_window(self, rects=None):
+        # Parts of the surface only scale like the whole with an integer scale.
+        if rects is not None and self.scale == int(self.scale):
+            return self._scale_rects(rects, int(self.scale))
+
         scaled_draw = self.window.subsurface(self.scaled_draw_rect)
-        pygame.transform.scale(
-            self.draw_surface, self.scaled_draw_rect.size, scaled_draw
-        )
+        self.upscaler.scale(self.draw_surface, scaled_draw)
 
     def fixup_mouse_input(self, event):
         # noinspection PyTypeChecker
@@ -119,6 +289,7 @@ class ExtendFieldOfViewScreen(Screen):
     """
 
     def __init__(self, prefered_size):
+        super().__init__()
         self.prefered_size = prefered_size
         self.window_size = self._biggest_screen_available()
         self.scaled_draw_rect = pygame.Rect(0, 0, 0, 0)
@@ -147,14 +318,65 @@ class ExtendFieldOfViewScreen(Screen):
         self.scaled_draw_rect = pygame.Rect(topleft, scaled_draw_area)
         self.draw_surface = pygame.Surface(scaled_draw_area // self.scale)
 
-    def update_window(self):
+    def update_window(self, rects=None):
+        if rects is not None:
+            return self._scale_rects(rects, self.scale)
+
         scaled_draw = self.window.subsurface(self.scaled_draw_rect)
-        pygame.transform.scale(
-            self.draw_surface, self.scaled_draw_rect.size, scaled_draw
-        )
+        self.upscaler.scale(self.draw_surface, scaled_draw)
 
     def fixup_mouse_input(self, event):
         # noinspection PyTypeChecker
         event.pos = (
             pygame.Vector2(event.pos) - self.scaled_draw_rect.topleft
         ) // self.scale
+
+
+class RendererScreen(Screen):
+    """
+    A screen that lets the renderer of SDL scale and show the frame.
+
+    The draw_surface keeps the design size and is uploaded to a texture
+    every frame, that the renderer scales to the window, keeping the
+    aspect ratio with black borders. With a GPU, the scaling is free and
+    the cost of a frame no longer depends on the size of the window.
+    SDL also converts the mouse positions to the design size.
+    The renderer can only be used from the main thread.
+    """
+
+    PIPELINE = False
+
+    def __init__(self, design_size, title=GAME_NAME, vsync=False):
+        super().__init__()
+        self.design_size = design_size
+        self.sdl_window = Window(title, design_size, resizable=True)
+        # -1 uses a GPU renderer when there is one, and the software one otherwise
+        self.renderer = Renderer(self.sdl_window, accelerated=-1, vsync=vsync)
+        self.renderer.logical_size = design_size
+        self.texture = Texture(self.renderer, design_size, streaming=True)
+        self.draw_surface = pygame.Surface(design_size)
+
+    @property
+    def window_size(self):
+        return self.sdl_window.size
+
+    def resize(self, new_size=None):
+        if new_size is not None:
+            self.sdl_window.size = new_size
+
+    def update_window(self, rects=None):
+        if rects is None:
+            self.texture.update(self.draw_surface)
+        else:
+            for rect in rects:
+                self.texture.update(self.draw_surface.subsurface(rect), rect)
+
+        self.renderer.clear()
+        self.texture.draw()
+
+    def present(self, rects=None):
+        if rects == []:
+            return  # The window still shows the last frame
+
+        self.update_window(rects)
+        self.renderer.present()
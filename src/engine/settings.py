@@ -1,59 +1,76 @@
 import json
-from pathlib import Path
+from functools import partial
 
 
 __all__ = ["Settings", "settings"]
 
 from .constants import ASSETS_DIR
+from .persistence import atomic_write, writer
 
 
 class Settings:
     """
     A singleton for all the settings that can be saved and loaded from the disk.
 
-    Every attribute that is set in the __init__ will be saved and restored with :load: and :save:.
+    Every attribute that is set in :reset: will be saved and restored with :load: and :save:.
+    The file is only read the first time a setting is used, and saved in the background.
     """
 
     _instance = None
+    _loaded = False
     PATH = ASSETS_DIR / "settings.json"
 
     def __new__(cls):
-        if cls._instance:
-            return cls._instance
-
-        # create the only instance of cls
-        self = super(Settings, cls).__new__(cls)
-        cls._instance = self
-        # Then we set the defaults and load it from the disk
-        cls.__init__(self)
-        self.load()
-        # Finaly we swap __init__ and reset, so it will not be rest
-        # Every time Settings() is called, as __init__ is always called after __new__.
-        cls.reset = cls.__init__
-        cls.__init__ = lambda s: None
+        if cls._instance is None:
+            # create the only instance of cls
+            cls._instance = super(Settings, cls).__new__(cls)
+        return cls._instance
 
-        return self
+    def __getattr__(self, name):
+        # Only called for missing attributes, that is, every setting until they are loaded.
+        if name.startswith("_") or self._loaded:
+            raise AttributeError(name)
 
-    def __init__(self):
-        self.debug = False
-        self.highscores = []
-        self.name = "Cool kid"
-        self.last_score = None
-        self.mute = False
+        self.load()
+        return getattr(self, name)
 
     def load(self):
-        """(re)load the settings from the file. Called automatically on the first instance of Settings."""
+        """(re)load the settings from the file. Called automatically on the first use of a setting."""
+
+        # The settings changed before the first load are kept.
+        changed = {} if self._loaded else dict(self.__dict__)
 
+        self.reset()
         if self.PATH.exists():
             self.__dict__.update(json.loads(self.PATH.read_text()))
+        self.__dict__.update(changed)
+        self._loaded = True
 
     def save(self):
-        """Save the settings to its file. This is not called automatically."""
+        """Save the settings to its file, in the background. This is not called automatically.
 
-        self.PATH.write_text(json.dumps(self.__dict__))
+        Saves close in time are written only once, see BackgroundWriter.
+        """
+
+        if not self._loaded:
+            self.load()
+
+        values = {
+            name: value
+            # A copy, as the writer thread can remove old settings, see ScoreStore.
+            for name, value in list(self.__dict__.items())
+            if not name.startswith("_")
+        }
+        # Serialized now, as the settings can change before it is written.
+        writer.write(partial(atomic_write, self.PATH, json.dumps(values)), self.PATH)
 
     def reset(self):
         """Reset the settings."""
 
+        self.debug = False
+        self.name = "Cool kid"
+        self.last_score = None
+        self.mute = False
+
 
 settings = Settings()
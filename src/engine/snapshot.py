@@ -0,0 +1,66 @@
+"""
+Save and load a running state, for quick saves or to start a simulation
+at a given point of the game.
+
+Scripts are generators, which cannot be saved. Instead, everything but
+the scripts is pickled, and after loading, each object starts its script()
+again and should resume from its attributes (see Object.restore and
+State.restore). Particles are not saved either, they are only visual.
+The state of the random generator is saved, so a snapshot can be replayed.
+"""
+
+import copyreg
+import pickle
+import random
+from typing import TypeVar
+
+import pygame
+
+from .state_machine import State
+
+__all__ = ["snapshot", "load_snapshot"]
+
+S = TypeVar("S", bound=State)
+
+
+def _load_surface(data, size, mode, colorkey):
+    if 0 in size:
+        # frombytes() refuses empty images
+        flags = pygame.SRCALPHA if mode == "RGBA" else 0
+        surf = pygame.Surface(size, flags)
+    else:
+        surf = pygame.image.frombytes(data, size, mode)
+    if colorkey is not None:
+        surf.set_colorkey(colorkey)
+    return surf
+
+
+def _reduce_surface(surf: pygame.Surface):
+    mode = "RGBA" if surf.get_flags() & pygame.SRCALPHA else "RGB"
+    return (
+        _load_surface,
+        (pygame.image.tobytes(surf, mode), surf.get_size(), mode, surf.get_colorkey()),
+    )
+
+
+copyreg.pickle(pygame.Surface, _reduce_surface)
+
+
+def snapshot(state: State) -> bytes:
+    """Save the state and everything in it."""
+    return pickle.dumps((random.getstate(), state))
+
+
+def load_snapshot(data: bytes, restore_rng=True) -> S:
+    """Load a state saved by snapshot() and restart its scripts.
+
+    Args:
+        restore_rng: whether to also put the random generator back
+            as it was when the snapshot was taken.
+    """
+
+    rng, state = pickle.loads(data)
+    if restore_rng:
+        random.setstate(rng)
+    state.restore()
+    return state
@@ -1,16 +1,20 @@
 from enum import Enum
+from operator import attrgetter
 from random import randint
-from typing import List, Optional, Tuple, Type, TypeVar, Union
+from typing import Dict, List, Optional, Tuple, Type, TypeVar, Union
 
 import pygame
 from pygame.locals import *
 
 from .assets import play
+from .collisions import CollisionSystem
 from .constants import *
 from .particles import ParticleSystem
 from .pygame_input import Button, Inputs, JoyButton, QuitEvent
+from .screen import FrameDiff
 from .settings import settings
 from .utils import mix
+from .events import Died, EventBus, Spawned, StateChanged
 from .object import Scriptable
 
 T = TypeVar("T")
@@ -26,22 +30,30 @@ class StateOperations(Enum):
 
 
 class State(Scriptable):
+    TRANSIENT = Scriptable.TRANSIENT + ("particles", "inputs", "events", "joy")
     FPS = 60
     BG_COLOR = "black"
     BG_MUSIC = None
     BG_COLORS = []
     BG_TRANSITION_TIME = 20 * 60
+    DIRTY_RECTS = False
+    """Whether to only show the parts of the frame that changed, see dirty_rects()."""
 
     def __init__(self):
         super().__init__()
         self.timer = 0
         self.add_later = []
         self.add_object_lock = False
-        self.objects = set()
+        self.objects: Dict["Object", None] = {}
+        """Ordered by insertion, so that seeded games are reproducible."""
         self.next_state = (StateOperations.NOP, self)
         self.shake = 0
 
         self.particles = ParticleSystem()
+        self.collisions = CollisionSystem()
+        self.events = EventBus()
+        self.dying: List["Object"] = []
+        """Objects that died this frame, removed at the end of the frame."""
         from src.objects import Debug
 
         self.debug = self.add(Debug())
@@ -80,6 +92,7 @@ class State(Scriptable):
 
     def toggle_mute(self, *_):
         settings.mute = not settings.mute
+        settings.save()
         if settings.mute:
             pygame.mixer.music.set_volume(0)
         else:
@@ -98,6 +111,20 @@ class State(Scriptable):
     def on_exit(self):
         pass
 
+    def restore(self):
+        """Called after the state is loaded from a snapshot, see src.engine.snapshot.
+
+        The particles, the event handlers and the scripts are not saved,
+        the script of the state and of all objects start again.
+        """
+        self.particles = ParticleSystem()
+        self.events = EventBus()
+        self.inputs = Inputs()
+        self.add_script(self.script())
+
+        for object in [*self.objects, *self.add_later]:
+            object.restore()
+
     def script(self):
         """Script must be a generator where each yield will correspond to a frame.
 
@@ -122,7 +149,9 @@ class State(Scriptable):
         # Add all object that have been queued
         self.add_object_lock = False
         for object in self.add_later:
-            self.add(object)
+            # The ones that died before were already removed
+            if object.alive:
+                self.add(object)
         self.add_later = []
         self.add_object_lock = True
 
@@ -130,36 +159,48 @@ class State(Scriptable):
         for object in self.objects:
             object.logic()
         self.particles.logic()
+        self.collisions.logic()
 
-        # Clean dead objects
-        to_remove = set()
-        for object in self.objects:
-            if not object.alive:
-                to_remove.add(object)
-                object.on_death(self)
-        self.objects.difference_update(to_remove)
+        # Clean dead objects. Objects that die in on_death are removed next frame.
+        dying, self.dying = self.dying, []
+        for object in dying:
+            self.objects.pop(object, None)
+            self.collisions.remove_object(object)
+            object.on_death(self)
+            self.events.emit(Died(object))
+            self.events.forget(object)
 
     def draw(self, gfx: "GFX"):
         if self.BG_COLOR:
             gfx.fill(self.BG_COLOR)
 
+        # By Z, then in the order they were added. Particles are below the Z >= 0.
         did_draw_particles = False
-        for z in sorted(set(o.Z for o in self.objects)):
-            for obj in self.objects:
-                if z == obj.Z:
-                    obj.draw(gfx)
-                if z >= 0 and not did_draw_particles:
-                    self.particles.draw(gfx.surf)
-                    did_draw_particles = True
+        for obj in sorted(self.objects, key=attrgetter("Z")):
+            if obj.Z >= 0 and not did_draw_particles:
+                self.particles.draw(gfx)
+                did_draw_particles = True
+            obj.draw(gfx)
 
         if not did_draw_particles:
-            self.particles.draw(gfx.surf)
+            self.particles.draw(gfx)
 
         if self.shake:
             s = 3
             gfx.scroll(randint(-s, s), randint(-s, s))
             self.shake -= 1
 
+    def dirty_rects(self, surf: pygame.Surface, diff: "FrameDiff"):
+        """Return the parts of surf that changed since the last frame, or None for all of it.
+
+        Called only when DIRTY_RECTS is set. This is worth it for mostly
+        static states, like menus, as the window is only updated there.
+        By default, the frame is compared to the previous one. Override this
+        to declare the changed parts instead, and call diff.reset().
+        """
+
+        return diff.changed(surf)
+
     def handle_events(self, events):
         self.inputs.trigger(events)
 
@@ -180,12 +221,16 @@ class State(Scriptable):
             adding and storing it in a variable in the same line.
         """
 
-        if self.add_object_lock:
+        object.state = self
+
+        if not object.alive:
+            self.dying.append(object)
+        elif self.add_object_lock:
             self.add_later.append(object)
         else:
-            self.objects.add(object)
-
-        object.state = self
+            self.objects[object] = None
+            self.collisions.add_object(object)
+            self.events.emit(Spawned(object))
 
         return object
 
@@ -254,6 +299,7 @@ class StateMachine:
     @state.setter
     def state(self, value: Tuple[StateOperations, Optional[State]]):
         op, new = value
+        previous = self.state
 
         if op == StateOperations.NOP:
             pass
@@ -275,3 +321,9 @@ class StateMachine:
                 self.stack[-1].on_exit()
             self.stack.append(new)
             new.on_resume()
+
+        current = self.state
+        if current is not previous:
+            for state in (previous, current):
+                if state is not None:
+                    state.events.emit(StateChanged(state, op, previous, current))
@@ -4,6 +4,7 @@ from math import exp
 from random import randrange, uniform
 from typing import Tuple
 
+import numpy as np
 import pygame
 
 
@@ -91,22 +92,40 @@ def random_in_rect(rect: pygame.Rect, x_range=(0.0, 1.0), y_range=(0.0, 1.0)):
     )
 
 
-def random_in_surface(surf: pygame.Surface, max_retries=100):
+@lru_cache(10000)
+def opaque_mask(surf: pygame.Surface):
+    """Return a boolean array of shape (w, h) of the pixels that are not transparent.
+
+    Pixels are transparent when they are the colorkey or fully transparent.
+    The result is cached, so the surface should not be modified afterwards.
+    """
+
+    opaque = pygame.surfarray.array_colorkey(surf) != 0
+    if surf.get_flags() & pygame.SRCALPHA:
+        opaque &= pygame.surfarray.array_alpha(surf) != 0
+    return opaque
+
+
+@lru_cache(10000)
+def opaque_pixels(surf: pygame.Surface):
+    """Return an array of shape (n, 2) of the coordinates of all the non-transparent pixels."""
+    return np.argwhere(opaque_mask(surf))
+
+
+def random_in_surface(surf: pygame.Surface):
     """Return a random point that is not transparent in a surface.
 
-    After max_retry, returns the center of the surface.
+    If there is no such point, returns the center of the surface.
     """
-    w, h = surf.get_size()
-    color_key = surf.get_colorkey()
-    with lock(surf):
-        for _ in range(max_retries):
-            pos = randrange(w), randrange(h)
-            color = surf.get_at(pos)
-            if not (color == color_key or color[3] == 0):
-                # Pixel is not transparent.
-                return pos
+
+    pixels = opaque_pixels(surf)
+    if len(pixels) == 0:
+        w, h = surf.get_size()
         return (w // 2, h // 2)
 
+    x, y = pixels[randrange(len(pixels))]
+    return int(x), int(y)
+
 
 @contextmanager
 def lock(surf):
@@ -121,7 +140,7 @@ def lock(surf):
 def clamp_length(vec, maxi):
     """Scale the vector so it has a length of at most :maxi:"""
 
-    if vec.length() > maxi:
+    if vec.length_squared() > maxi * maxi:
         vec.scale_to_length(maxi)
 
     return vec
@@ -132,8 +151,7 @@ def part_perp_to(u, v):
     if v.length_squared() == 0:
         return u
 
-    v = v.normalize()
-    return u - v * v.dot(u)
+    return u - v * (v.dot(u) / v.length_squared())
 
 
 def prop_in_rect(rect: pygame.Rect, prop_x: float, prop_y: float):
@@ -191,6 +209,18 @@ def exp_impulse(x, k):
     return h * exp(1.0 - h)
 
 
+@lru_cache(1000)
+def easing_table(curve, lifespan, *params):
+    """Sample curve(life_prop, *params) at each frame of a particle living :lifespan: frames.
+
+    The value at the age-th frame is table[age]. Tables are cached, so curve
+    should be a module level function, not a closure. They are tuples for
+    the particles, but np.array(table)[ages] gives the values of many at once.
+    """
+
+    return tuple(curve(age / lifespan, *params) for age in range(int(lifespan) + 1))
+
+
 def auto_crop(surf: pygame.Surface):
     """Return the smallest subsurface of an image that contains all the visible pixels."""
 
@@ -198,17 +228,22 @@ def auto_crop(surf: pygame.Surface):
     return surf.subsurface(rect)
 
 
+@lru_cache(1000)
 def outline(surf: pygame.Surface, color=(255, 255, 255)):
     """Create an outline on the surface of the biven color."""
 
-    mask = pygame.mask.from_surface(surf)
-    outline = mask.outline()
-    output = pygame.Surface((surf.get_width() + 2, surf.get_height() + 2))
+    # Dilate the opaque pixels by one in the four directions.
+    opaque = np.pad(opaque_mask(surf), 1)
+    dilated = opaque.copy()
+    dilated[1:, :] |= opaque[:-1, :]
+    dilated[:-1, :] |= opaque[1:, :]
+    dilated[:, 1:] |= opaque[:, :-1]
+    dilated[:, :-1] |= opaque[:, 1:]
 
-    with lock(output):
-        for x, y in outline:
-            for dx, dy in ((0, 1), (1, 0), (-1, 0), (0, -1)):
-                output.set_at((x + dx + 1, y + dy + 1), color)
+    output = pygame.Surface((surf.get_width() + 2, surf.get_height() + 2))
+    pixels = pygame.surfarray.pixels3d(output)
+    pixels[dilated & ~opaque] = pygame.Color(color)[:3]
+    del pixels  # Unlock the surface
 
     output.blit(surf, (1, 1))
 
@@ -255,6 +290,21 @@ def random_in_rect_and_avoid(
     return default
 
 
+@lru_cache(10000)
+def hsv_color(hue, saturation=100, value=100, alpha=100):
+    """Convert a color from HSV to a RGBA tuple, cached.
+
+    Args:
+        hue: integer between 0 and 360, other values wrap around
+        saturation: integer between 0 and 100
+        value: integer between 0 and 100
+        alpha: integer between 0 and 100
+    """
+    color = pygame.Color(0)
+    color.hsva = hue % 360, saturation, value, alpha
+    return tuple(color)
+
+
 def random_rainbow_color(saturation=100, value=100):
     """Get a random color from the rainbow.
 
@@ -262,7 +312,4 @@ def random_rainbow_color(saturation=100, value=100):
         saturation: integer between 0 and 100
         value: integer between 0 and 100
     """
-    hue = randrange(0, 360)
-    color = pygame.Color(0)
-    color.hsva = hue, saturation, value, 100
-    return color
+    return pygame.Color(hsv_color(randrange(0, 360), saturation, value))
@@ -1,225 +1,222 @@
+"""
+Levels are described in assets/levels.json, as a list of waves.
+
+Each wave spawns enemies, then waits before the next one:
+    {"spawn": [[enemy, position, *args], ...], "wait": ..., "repeat": n}
+
+- enemy is the name of an enemy class, or null for a random one.
+- position is an int between -2 and 2 for the sides and the top of the screen,
+    [x, y] as proportions of the world, or null for a random place at the top.
+- args are given to the enemy, the Boss accepts the [x, y] of its home.
+- wait is a number of seconds, that ends early when all enemies are dead,
+    "clear" to wait until all enemies are dead, or missing to go on immediately.
+- repeat is how many times the wave is spawned, 1 by default.
+
+The file is compiled once, at import time, into a timeline of waves with their
+positions and enemy factories resolved. Importing this module validates it.
+"""
+
+import inspect
+import json
+from dataclasses import dataclass
 from random import choice, uniform
-from random import choice, uniform
-from typing import Tuple, Type, Union
+from typing import Callable, List, Optional, Tuple, Union
 
+from pygame import Vector2
 
 from src.engine import *
 from src.objects import *
 
-__all__ = ["LEVELS"]
-
-
-class Level:
-    def __init__(self, state):
-        self.state = state
-        self.skip = False
-
-    def spawn(
-        self, enemy: Type[Enemy] = None, pos: Union[int, Tuple, None] = None, *args
-    ):
-        positions = [
-            (-0.1, 0.2),  # -2, left side
-            (0.2, -0.2),  # -1, left up
-            (0.5, -0.2),  # 0, up
-            (0.8, -0.2),  # 1, right up
-            (1.1, 0.2),  # 2, right side
-        ]
-
-        if pos is None:
-            pos = self.random_at_top()
-        elif isinstance(pos, int):
-            pos = positions[pos + 2]
-            pos = prop_in_rect(WORLD, *pos)
-
-        if enemy is None:
-            enemy = self.random_enemy()
-
-        return self.state.add(enemy(pos, *args))
-
-    def all_enemy_types(self):
-        return [
-            Enemy,
-            LaserEnemy,
-            BomberEnemy,
-            ChargeEnemy,
-            lambda *args: CopyEnemy(*args, player=self.state.player),
-        ]
-
-    def random_enemy(self) -> Enemy:
-        # noinspection PyTypeChecker
-        return choice(self.all_enemy_types())
-
-    def any_alive(self):
-        return any(e.alive for e in self.state.get_all(Enemy))
-
-    def wait_until_dead(self, *enemies):
-        if len(enemies) == 0:
-            yield  # Enemies may have not been added to the state yet.
-            while self.any_alive() and not self.skip:
-                yield
-        else:
-            while any(e.alive for e in enemies) and not self.skip:
-                yield
-
-    def random_at_top(self):
-        return uniform(0, WORLD.right), -40
-
-    def wait(self, seconds):
-        yield  # Enemies may have not been added to the state yet.
-        for _ in range(int(seconds * 60 - 1)):
-            if self.any_alive() and not self.skip:
-                yield
-
-    def script(self):
-        yield
-
+__all__ = ["LEVELS", "Level", "LevelData", "load_levels"]
 
-class Level1(Level):
-    """First level, "tutorial"."""
 
-    def script(self):
-        self.spawn(Enemy, -1)
-        self.spawn(Enemy, 1)
-        yield from self.wait_until_dead()
-
-        self.spawn(Enemy, -2)
-        self.spawn(Enemy, 0)
-        self.spawn(Enemy, 2)
+LEVELS_FILE = ASSETS_DIR / "levels.json"
 
+POSITIONS = [
+    prop_in_rect(WORLD, *prop)
+    for prop in [
+        (-0.1, 0.2),  # -2, left side
+        (0.2, -0.2),  # -1, left up
+        (0.5, -0.2),  # 0, up
+        (0.8, -0.2),  # 1, right up
+        (1.1, 0.2),  # 2, right side
+    ]
+]
 
-class Level2(Level):
-    """Introduces lasers"""
+# Factories take the state and the position of the enemy.
+ENEMIES = {
+    "Enemy": lambda state, pos: Enemy(pos),
+    "LaserEnemy": lambda state, pos: LaserEnemy(pos),
+    "BomberEnemy": lambda state, pos: BomberEnemy(pos),
+    "ChargeEnemy": lambda state, pos: ChargeEnemy(pos),
+    "CopyEnemy": lambda state, pos: CopyEnemy(pos, state.player),
+}
+RANDOM_ENEMIES = list(ENEMIES.values())
 
-    def script(self):
-        self.spawn(Enemy, -2)
-        self.spawn(LaserEnemy, 0)
-        self.spawn(Enemy, 2)
+BOSSES = {
+    "Boss": lambda state, pos, home=(0.5, 0.5): Boss(pos, prop_in_rect(WORLD, *home)),
+}
 
-        yield from self.wait(5)
 
-        self.spawn(Enemy, -1)
-        self.spawn(Enemy, 1)
+def random_enemy(state, pos):
+    return choice(RANDOM_ENEMIES)(state, pos)
 
-        yield from self.wait(3)
 
-        self.spawn(LaserEnemy, -2)
-        self.spawn(LaserEnemy, 2)
+@dataclass(frozen=True)
+class Spawn:
+    factory: Callable[..., Enemy]
+    pos: Optional[Vector2]
+    """None for a random position at the top."""
+    args: Tuple = ()
 
 
-class Level3(Level):
-    """Introduces bomber."""
-
-    def script(self):
-        self.spawn(BomberEnemy)
-        yield from self.wait(4)
+@dataclass(frozen=True)
+class Wave:
+    spawns: Tuple[Spawn, ...]
+    wait: Union[float, str, None]
 
-        for i in range(10):
 
-            if i % 2 == 0:
-                self.spawn(Enemy)
-            else:
-                self.spawn(LaserEnemy)
+@dataclass(frozen=True)
+class LevelData:
+    description: str
+    waves: Tuple[Wave, ...]
 
-            if i in (5, 9):
-                self.spawn(BomberEnemy)
+    @classmethod
+    def compile(cls, data, name="level"):
+        """Resolve the enemies and positions of the description of a level.
 
-            yield from self.wait(3)
-        yield from self.wait(11)
+        Raises:
+            ValueError: if the description is invalid.
+        """
 
-        self.spawn(Enemy, -1)
-        self.spawn(Enemy, 1)
-        self.spawn(LaserEnemy, -2)
-        self.spawn(LaserEnemy, 2)
-        self.spawn(BomberEnemy)
-        self.spawn(BomberEnemy)
-
-
-class Level4(Level):
-    """Introducing chargers."""
-
-    def script(self):
+        if not isinstance(data, dict) or not isinstance(data.get("waves"), list):
+            raise ValueError(f"{name}: a level needs a list of waves.")
 
-        self.spawn(ChargeEnemy, 1)
-        yield from self.wait(4)
-        for i in range(-2, 3):
-            self.spawn(ChargeEnemy, i)
+        waves = []
+        for i, wave in enumerate(data["waves"]):
+            where = f"{name}, wave {i}"
+            if not isinstance(wave, dict):
+                raise ValueError(f"{where}: invalid wave {wave!r}.")
+            spawns = tuple(cls.compile_spawn(s, where) for s in wave.get("spawn", ()))
 
-        yield from self.wait(10)
+            wait = wave.get("wait")
+            if not (wait is None or wait == "clear" or isinstance(wait, (int, float))):
+                raise ValueError(f"{where}: invalid wait {wait!r}.")
 
-        for i in range(10):
-            self.spawn(ChargeEnemy)
-            self.spawn(LaserEnemy)
-            yield from self.wait(5 - i / 2)
+            repeat = wave.get("repeat", 1)
+            if not isinstance(repeat, int) or repeat < 1:
+                raise ValueError(f"{where}: repeat must be a positive int.")
 
+            waves += [Wave(spawns, wait)] * repeat
 
-class Level5(Level):
-    """Introduces Copy"""
+        return cls(data.get("description", ""), tuple(waves))
 
-    def script(self):
-        player = self.state.player
-        self.spawn(CopyEnemy, 0, player)
-        yield from self.wait_until_dead()
+    @staticmethod
+    def compile_spawn(spawn, where) -> Spawn:
+        if not isinstance(spawn, list) or len(spawn) < 2:
+            raise ValueError(
+                f"{where}: a spawn is [enemy, position, *args], not {spawn!r}."
+            )
+        enemy, pos, *args = spawn
 
-        self.spawn(CopyEnemy, -2, player)
-        self.spawn(CopyEnemy, 2, player)
-        yield from self.wait_until_dead()
+        if enemy is None:
+            factory = random_enemy
+        elif enemy in ENEMIES:
+            factory = ENEMIES[enemy]
+        elif enemy in BOSSES:
+            factory = BOSSES[enemy]
+        else:
+            raise ValueError(f"{where}: unknown enemy {enemy!r}.")
 
-        self.spawn(CopyEnemy, -2, player)
-        self.spawn(Enemy, 0)
-        self.spawn(Enemy, 2)
+        if pos is None:
+            pass
+        elif isinstance(pos, int) and -2 <= pos <= 2:
+            pos = POSITIONS[pos + 2]
+        elif isinstance(pos, list) and len(pos) == 2:
+            pos = prop_in_rect(WORLD, *pos)
+        else:
+            raise ValueError(f"{where}: invalid position {pos!r}.")
 
-        yield from self.wait(10)
+        try:
+            # Checked now, not when the enemy spawns in the middle of the game.
+            inspect.signature(factory).bind(None, pos, *args)
+        except TypeError:
+            raise ValueError(f"{where}: invalid arguments {args!r} for {enemy!r}.")
 
-        for e in self.all_enemy_types():
-            self.spawn(e)
+        return Spawn(factory, pos, tuple(args))
 
 
-class Level6(Level):
-    """Hell breaks loose but not that much"""
+def load_levels(path=LEVELS_FILE) -> List[LevelData]:
+    levels = json.loads(path.read_text())
+    return [LevelData.compile(data, f"level {i + 1}") for i, data in enumerate(levels)]
 
-    def script(self):
-        player = self.state.player
 
-        self.spawn(CopyEnemy, -2, player)
-        self.spawn(CopyEnemy, 2, player)
+class Level:
+    def __init__(self, state, data: LevelData):
+        self.state = state
+        self.data = data
+        self.cursor = 0
+        """Index of the current wave."""
+        self.spawned = False
+        """Whether the current wave was spawned, and only its wait remains."""
+        self.skip = False
 
-        yield from self.wait(6)
+    def __getstate__(self):
+        # The factories cannot be saved, only which level it is
+        state = self.__dict__.copy()
+        state["data"] = LEVELS.index(self.data)
+        return state
 
-        for i in range(10):
-            self.spawn()
-            self.spawn(Enemy)
-            yield from self.wait(3)
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.data = LEVELS[self.data]
 
+    def spawn(self, spawn: Spawn):
+        pos = spawn.pos
+        if pos is None:
+            pos = self.random_at_top()
 
-class Level7(Level):
-    """Hell breaks loose...r"""
+        return self.state.add(spawn.factory(self.state, pos, *spawn.args))
 
-    def script(self):
-        player = self.state.player
+    def any_alive(self):
+        return any(e.alive for e in self.state.get_all(Enemy))
 
-        for _ in range(2):
-            for e in self.all_enemy_types():
-                self.spawn(e)
-                self.spawn(CopyEnemy, None, player)
-                yield from self.wait(4)
+    def wait_until_dead(self, *enemies):
+        if len(enemies) == 0:
+            yield  # Enemies may have not been added to the state yet.
+            while self.any_alive() and not self.skip:
+                yield UntilExtinct(self.state, Enemy)
+        else:
+            while any(e.alive for e in enemies) and not self.skip:
+                yield UntilDead(*enemies)
 
+    def random_at_top(self):
+        return uniform(0, WORLD.right), -40
 
-class Level8(Level):
-    """Da boss."""
+    def wait(self, seconds):
+        yield  # Enemies may have not been added to the state yet.
+        if self.any_alive() and not self.skip:
+            yield UntilExtinct(self.state, Enemy, timeout=int(seconds * 60 - 1))
 
     def script(self):
-        self.spawn(Boss, 0)
-        yield
+        # This starts again at the current wave when restored from a snapshot.
+        waves = self.data.waves
+        while self.cursor < len(waves):
+            wave = waves[self.cursor]
 
+            if not self.spawned:
+                for spawn in wave.spawns:
+                    self.spawn(spawn)
+                self.spawned = True
 
-class Level9(Level):
-    """Who said it is over ?"""
+            if wave.wait == "clear":
+                yield from self.wait_until_dead()
+            elif wave.wait is not None:
+                yield from self.wait(wave.wait)
 
-    def script(self):
-        self.spawn(Boss, -2, prop_in_rect(WORLD, 0.25, 0.25))
-        self.spawn(Boss, 2, prop_in_rect(WORLD, 0.75, 0.25))
-        yield
+            self.cursor += 1
+            self.spawned = False
 
 
-LEVELS = Level.__subclasses__()
-# LEVELS = [Level5]
+LEVELS = load_levels()
+# LEVELS = LEVELS[4:5]
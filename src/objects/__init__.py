@@ -2,5 +2,6 @@ from .bullets import *
 from .enemies import *
 from .other import *
 from .spaceship import *
+from .steering import *
 from .skilltree import *
 from .player import *
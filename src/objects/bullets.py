@@ -1,7 +1,7 @@
 from math import pi, sin
-from random import gauss, random
+from random import gauss
 
-import pygame.gfxdraw
+import pygame
 from pygame import Vector2
 
 from src.engine import *
@@ -20,18 +20,8 @@ class BaseBullet:
         self.crit = crit
         self.angle = angle
 
-    def logic(self, state):
-        if self.owner is state.player:
-            from .enemies import Enemy
-
-            for enemy in state.get_all(Enemy):
-                if self.handle_collision(enemy, state):
-                    break
-        else:
-            self.handle_collision(state.player, state)
-
-    def handle_collision(self, other, state) -> bool:
-        return False
+    def handle_collision(self, other: Collider):
+        """Called by the collision system when the bullet hits a ship."""
 
 
 class Bullet(SpriteObject, BaseBullet):
@@ -39,6 +29,8 @@ class Bullet(SpriteObject, BaseBullet):
     SPEED = 5
     SIZE = (1, 1)
     INITIAL_ROTATION = 90
+    AREA = WORLD.inflate(200, 200)
+    """Where bullets can hit something, ships are never 100px out of the world."""
 
     def __init__(self, pos, direction, owner, damage=100, speed=5, crit=False, kind=0):
         play("shoot")
@@ -56,66 +48,67 @@ class Bullet(SpriteObject, BaseBullet):
         BaseBullet.__init__(self, owner, damage, speed, angle, crit)
         SpriteObject.__init__(self, pos, img, (0, 0), img.get_size(), vel, 90 - angle)
 
+        self.colliders.append(
+            PointCollider(self, "bullet", [owner.OPPONENTS], self.handle_collision)
+        )
+
     def logic(self):
         SpriteObject.logic(self)
-        BaseBullet.logic(self, self.state)
 
-        screen = WORLD.inflate(1000, 1000)
-        if not screen.collidepoint(*self.pos):
+        # Bullets go straight, so they never come back.
+        if not self.AREA.collidepoint(self.pos):
             self.alive = False
 
-    def handle_collision(self, other, state):
-        if other.rect.collidepoint(self.pos):
-            other.hit(self)
-            self.alive = False
-            for _ in range(36 if self.crit else 12):
-                state.particles.add(
-                    LineParticle(gauss(8, 2), YELLOW)
-                    .builder()
-                    .at(self.pos, gauss(self.angle + 180, 20))
-                    .velocity(gauss(5, 1))
-                    .sized(uniform(1, 3))
-                    .living(10)
-                    .anim_fade()
-                    .build()
-                )
+    def handle_collision(self, other: Collider):
+        state = self.state
+        other.owner.hit(self)
+        self.alive = False
+        for _ in range(36 if self.crit else 12):
+            state.particles.add(
+                LineParticle(gauss(8, 2), YELLOW)
+                .builder()
+                .at(self.pos, gauss(self.angle + 180, 20))
+                .velocity(gauss(5, 1))
+                .sized(uniform(1, 3))
+                .living(10)
+                .anim_fade()
+                .build()
+            )
+
+        if self.crit:
+            crit_text = font(42).render("CRIT!", False, RED)
+            sizes = easing_table(bounce, 2 * 60)
 
-            if self.crit:
-                crit_text = font(42).render("CRIT!", False, RED)
+            def expand(particle):
+                particle.size = 20 * sizes[particle.age]
+                particle.need_redraw = True
 
-                def expand(particle):
-                    particle.size = 20 * bounce(particle.life_prop)
-                    particle.need_redraw = True
+            state.particles.add(
+                ImageParticle(crit_text)
+                .builder()
+                .at(self.pos, 0)
+                .velocity(0)
+                .sized(4)
+                .anim(expand)
+                .anim_fade(0.75)
+                .living(2 * 60)
+                .build()
+            )
 
+            tot = 20
+            for i in range(tot):
                 state.particles.add(
-                    ImageParticle(crit_text)
+                    SquareParticle(YELLOW)
                     .builder()
-                    .at(self.pos, 0)
-                    .velocity(0)
+                    .at(self.pos, 360 * i / (tot - 1))
+                    .velocity(v := 4, 3)
+                    .living(l := 30)
+                    .acceleration(-v / l)
                     .sized(4)
-                    .anim(expand)
-                    .anim_fade(0.75)
-                    .living(2 * 60)
+                    .anim_fade()
                     .build()
                 )
 
-                tot = 20
-                for i in range(tot):
-                    state.particles.add(
-                        SquareParticle(YELLOW)
-                        .builder()
-                        .at(self.pos, 360 * i / (tot - 1))
-                        .velocity(v := 4, 3)
-                        .living(l := 30)
-                        .acceleration(-v / l)
-                        .sized(4)
-                        .anim_fade()
-                        .build()
-                    )
-
-            return True
-        return False
-
 
 class DebuffBullet(Bullet):
     def __init__(
@@ -124,11 +117,9 @@ class DebuffBullet(Bullet):
         super().__init__(pos, direction, owner, damage, speed, crit)
         self.debuff = debuff
 
-    def handle_collision(self, other, state):
-        if super().handle_collision(other, state):
-            other.debuffs.add(self.debuff)
-            return True
-        return False
+    def handle_collision(self, other: Collider):
+        super().handle_collision(other)
+        other.owner.debuffs.add(self.debuff)
 
 
 class Laser(Object, BaseBullet):
@@ -154,14 +145,21 @@ class Laser(Object, BaseBullet):
         self.preshoot_end = preshoot_duration + self.follow_player_end
         self.laser_duration = laser_duration + self.preshoot_end
 
+        self.beam = SegmentCollider(
+            self, "laser", 1000, [owner.OPPONENTS], self.handle_collision
+        )
+        self.beam.enabled = False
+        self.colliders.append(self.beam)
+
+        # Disappear with the shooter
+        owner.state.events.subscribe(Died, self.on_owner_death, owner)
+
     def logic(self):
         Object.logic(self)
 
         self.timer += 1
 
         # Keep in sync with the shooter
-        if not self.owner.alive:
-            self.alive = False
         self.pos = self.owner.sprite_to_screen(self.owner.GUN)
         if self.timer < self.follow_player_end:
             self.angle = self.owner.angle + self.offset_angle
@@ -181,32 +179,32 @@ class Laser(Object, BaseBullet):
                 .hsv(uniform(0, 360), 0.8, 1)
                 .build()
             )
-
-            BaseBullet.logic(self, self.state)
+        self.beam.enabled = self.timer > self.preshoot_end
 
         # End
         if self.timer > self.laser_duration:
             self.alive = False
 
-    def handle_collision(self, other, state):
-        start = self.pos
-        end = self.pos + from_polar(1000, self.angle)
+    def restore(self):
+        super().restore()
+        self.state.events.subscribe(Died, self.on_owner_death, self.owner)
+
+    def on_owner_death(self, event: Died):
+        self.alive = False
+
+    def on_death(self, state):
+        super().on_death(state)
+        state.events.unsubscribe(Died, self.on_owner_death, self.owner)
+
+    def handle_collision(self, other: Collider):
+        other.owner.hit(self)
 
-        if p := other.rect.clipline((start, end)):
-            other.hit(self)
-            start, end = p
-            for _ in range(6):
-                pos = start + random() * (pygame.Vector2(end) - start)
-                state.particles.add_fire_particle(pos, self.angle)
-            return True
-        return False
+        start, end = other.rect.clipline(self.beam.start, self.beam.end)
+        self.state.particles.add_fire_particles(start, end, self.angle, 6)
 
     def draw(self, gfx):
         if self.timer < self.preshoot_end:
-            d = from_polar(3, self.angle)
-            for i in range(200):
-                p = vec2int(self.pos + d * i)
-                gfx.surf.set_at(p, RED)
+            gfx.dots(self.pos, from_polar(3, self.angle), 200, RED)
 
 
 class Bomb(Object, BaseBullet):
@@ -227,9 +225,15 @@ class Bomb(Object, BaseBullet):
         self.duration = timer
         self.timer = timer
 
-    def logic(self):
-        from .spaceship import SpaceShip
+        self.explosion = CircleCollider(
+            self, "explosion", self.RADIUS, ["ship"], self.handle_collision
+        )
+        self.explosion.enabled = False
+        # Ships avoid the bombs
+        self.personal_space = CircleCollider(self, "avoid", self.size.length())
+        self.colliders += [self.explosion, self.personal_space]
 
+    def logic(self):
         super().logic()
         self.animation.logic()
 
@@ -238,20 +242,19 @@ class Bomb(Object, BaseBullet):
             self.vel *= 0
             self.set = True
 
+        self.explosion.enabled = self.timer == 0
         if self.timer == 0:
             self.animation = Animation("explosion1")
             play("explosion")
-            for ship in self.state.get_all(SpaceShip):
-                if (
-                    ship.center.distance_to(self.center)
-                    < self.RADIUS + ship.size.length() / 2
-                ):
-                    self.angle = (ship.center - self.center).as_polar()[1]
-                    ship.hit(self)
 
         if self.timer == -len(self.animation):
             self.alive = False
 
+    def handle_collision(self, other: Collider):
+        ship = other.owner
+        self.angle = (ship.center - self.center).as_polar()[1]
+        ship.hit(self)
+
     def draw(self, gfx):
 
         if 0 < self.timer < self.duration:
@@ -263,9 +266,7 @@ class Bomb(Object, BaseBullet):
                 )
                 * 60
             )
-            pygame.gfxdraw.filled_circle(
-                gfx.surf, *vec2int(self.center), self.RADIUS, RED + (int(alpha),)
-            )
+            gfx.filled_circle(self.center, self.RADIUS, RED + (int(alpha),))
 
         frame = self.animation.image()
         gfx.blit(frame, center=self.center)
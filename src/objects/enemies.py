@@ -40,7 +40,7 @@ class Enemy(SpaceShip):
             state = App.current_state()
             for _ in range(3):
                 self.fire(state, state.player.pos - self.pos)
-                yield from range(8)
+                yield Sleep(8)
 
     def fire(self, state, direction):
         return state.add(
@@ -80,9 +80,8 @@ class LaserEnemy(Enemy):
             bullet = self.fire(state, self.state.player)
             while bullet.alive:
                 yield from self.slow_down_and_stop()
-                # slow_down_and_stop is an empty generator,
-                # if we are already stopped. It would result in an empty loop
-                yield
+                # Stopped, only a hit can move the ship before the laser ends
+                yield UntilEvent(self.state, (Died, bullet), (Hit, self))
 
 
 class ChargeEnemy(Enemy):
@@ -254,7 +253,9 @@ class Boss(Enemy):
             lasers = list(self.fire_laser())
             while any(l.alive for l in lasers):
                 yield from self.slow_down_and_stop()
-                yield
+                yield UntilEvent(
+                    self.state, (Hit, self), *[(Died, laser) for laser in lasers]
+                )
         else:
             yield from self.go_straight_to(prop_in_rect(WORLD, 0.5, 0.2), 10)
             for i in range(100):
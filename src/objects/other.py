@@ -120,13 +120,13 @@ class Debug(Object):
             self.points, self.vectors, self.rects, self.texts = self.lasts
 
         for (x, y, color) in self.points:
-            pygame.draw.circle(gfx.surf, color, (x, y), 1)
+            gfx.circle((x, y), 1, color)
 
         for (anchor, vec, color) in self.vectors:
-            pygame.draw.line(gfx.surf, color, anchor, anchor + vec)
+            gfx.line(anchor, anchor + vec, color)
 
         for rect, color in self.rects:
-            pygame.draw.rect(gfx.surf, color, rect, 1)
+            gfx.rect(*rect, color, 1)
 
         y = 3
         for i, obj in enumerate(self.texts):
@@ -152,6 +152,7 @@ class Title(Object):
     def __init__(self, text, color=YELLOW, duration=4 * 60, animation="enlarge"):
         self.duration = duration
         self.color = color
+        self.animation = animation
         self.bg_rect = pygame.Rect(0, 0, 0, 3)
 
         surf = font(42).render(text, True, color)
@@ -160,7 +161,9 @@ class Title(Object):
         self.text_surf = surf
         self.shown_image = pygame.Surface((0, 0))
         super().__init__(rect.topleft, surf.get_size())
-        self.scripts = {getattr(self, animation)()}
+
+    def script(self):
+        return getattr(self, self.animation)()
 
     def enlarge(self):
         widen_frames = 40
@@ -296,8 +299,7 @@ class Menu(Object):
                 color = "white"
 
             s = text(action, 32, color)
-            r = s.get_rect(midtop=midtop)
-            gfx.surf.blit(s, r)
+            r = gfx.blit(s, midtop=midtop)
             midtop = r.midbottom
 
 
@@ -16,6 +16,8 @@ from .. import states
 
 
 class Player(SpaceShip):
+    TEAM = "player"
+    OPPONENTS = "enemy"
     SCALE = 2
     MAX_THRUST = 0.5
 
@@ -43,6 +45,19 @@ class Player(SpaceShip):
 
         # self.debuffs.add(RegenDebuff(100000000, 0.01))
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The powers cannot be saved, only their levels
+        state["skill_tree"] = [node.power.level for node in self.skill_tree.bfs()]
+        return state
+
+    def __setstate__(self, state):
+        levels = state.pop("skill_tree")
+        super().__setstate__(state)
+        self.skill_tree = build_skill_tree()
+        for node, level in zip(self.skill_tree.bfs(), levels):
+            node.power.level = level
+
     def move_horizontally(self, axis: Axis):
         self.vel.x += axis.value * self.MAX_THRUST * 2
 
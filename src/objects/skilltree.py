@@ -2,6 +2,8 @@ from dataclasses import dataclass
 from functools import partial
 from typing import Callable, List, Optional, TYPE_CHECKING
 
+from pygame import Vector2
+
 from src.engine import *
 
 if TYPE_CHECKING:
@@ -48,9 +50,8 @@ class Power:
         fg = scale(self.sprite, scaling)
         if darken:
             fg = overlay(fg, (0, 0, 0), 150)
-        r = fg.get_rect(center=center)
-        gfx.surf.blit(bg, bg.get_rect(center=center))
-        gfx.surf.blit(fg, r)
+        gfx.blit(bg, center=center)
+        gfx.blit(fg, center=center)
 
 
 @Power.make("Attack up", "+20% damage to enemies", 0)
@@ -131,6 +132,11 @@ class Node(Object):
         self.x_start = 0
         self.x_end = 0
 
+        # Caches, only used on the root
+        self._layout_key = None
+        self._layouts = {}
+        self._renders = {}
+
     def __repr__(self):
         return f"Node({self.power.name}, {len(self.children)} children)"
 
@@ -139,13 +145,37 @@ class Node(Object):
         for child in self.children:
             yield from child.bfs()
 
+    def invalidate(self):
+        """Forget the cached layouts and renders. Must be called when the tree is modified."""
+        self._layout_key = None
+        self._layouts.clear()
+        self._renders.clear()
+
     def layout(self, root_center, spacing_x=35, spacing_y=35):
-        self.layout_phase1()
-        self.layout_phase2(spacing_x, spacing_y)
+        """Place every node of the tree so that the root is at root_center.
+
+        Each layout is computed once and then only restored.
+        """
+
+        key = (*root_center, spacing_x, spacing_y)
+        if key == self._layout_key:
+            return
+
+        positions = self._layouts.get(key)
+        if positions is None:
+            self.layout_phase1()
+            self.layout_phase2(spacing_x, spacing_y)
+
+            displacement = root_center - self.center
+            for node in self.bfs():
+                node.pos += displacement
+
+            self._layouts[key] = [Vector2(node.pos) for node in self.bfs()]
+        else:
+            for node, pos in zip(self.bfs(), positions):
+                node.pos.update(pos)
 
-        displacement = root_center - self.center
-        for node in self.bfs():
-            node.pos += displacement
+        self._layout_key = key
 
     def layout_phase1(self):
         x = self.x_start
@@ -169,19 +199,59 @@ class Node(Object):
         else:
             self.pos.x = self.x_start * spacing_x
 
+    def render_key(self):
+        """Everything that changes how the tree looks, apart from the layout."""
+        return tuple((node.power.level, node.power.selected) for node in self.bfs())
+
     def draw(self, gfx: "GFX", scale=1):
+        """Draw the whole tree with the current layout.
+
+        The tree is rendered off-screen only when a level or the selection changes.
+        """
+
+        key = self.render_key()
+        cache_key = (self._layout_key, scale)
+        cached = self._renders.get(cache_key)
+        if cached is None or cached[0] != key:
+            cached = key, *self.render(scale)
+            self._renders[cache_key] = cached
+
+        _, surf, topleft = cached
+        gfx.blit(surf, topleft=topleft)
+
+    def render(self, scale=1):
+        """Render the tree on a new surface, and return it with the position of its topleft."""
+
+        # Half of the background and its two outlines, plus one for rounding.
+        margin = 16 * scale + 3
+        centers = [node.center for node in self.bfs()]
+        left = int(min(c.x for c in centers) - margin)
+        top = int(min(c.y for c in centers) - margin)
+        right = int(max(c.x for c in centers) + margin)
+        bottom = int(max(c.y for c in centers) + margin)
+
+        surf = pygame.Surface((right - left, bottom - top), pygame.SRCALPHA)
+        gfx = GFX(surf)
+        self.draw_subtree(gfx, Vector2(left, top), scale)
+        gfx.flush()
+
+        return surf, (left, top)
+
+    def draw_subtree(self, gfx: "GFX", offset, scale=1):
+        center = self.center - offset
         for child in self.children:
-            mid_y = (self.center.y + child.center.y) / 2
+            child_center = child.center - offset
+            mid_y = (center.y + child_center.y) / 2
             points = [
-                self.center,
-                (self.center.x, mid_y),
-                (child.center.x, mid_y),
-                child.center,
+                center,
+                (center.x, mid_y),
+                (child_center.x, mid_y),
+                child_center,
             ]
-            pygame.draw.lines(gfx.surf, YELLOW, False, points)
-            child.draw(gfx, scale)
+            gfx.lines(points, YELLOW)
+            child.draw_subtree(gfx, offset, scale)
 
-        self.power.draw(gfx, self.center, scale, not self.reachable())
+        self.power.draw(gfx, center, scale, not self.reachable())
 
     def reachable(self):
         return self.parent is None or self.parent.power.level > 0
@@ -221,9 +291,11 @@ class FireDebuff(Debuff):
         if self.duration % 10 == 0:
             ship.damage(self.damage)
 
+        image = ship.image
+        topleft = image.get_rect(center=ship.center).topleft
         for _ in range(6):
-            pos = pygame.Vector2(random_in_surface(ship.image))
-            pos += ship.image.get_rect(center=ship.center).topleft
+            pos = pygame.Vector2(random_in_surface(image))
+            pos += topleft
             ship.state.particles.add_fire_particle(pos, 180 + ship.angle)
 
 
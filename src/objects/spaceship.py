@@ -5,7 +5,7 @@ from src.engine import *
 __all__ = ["SpaceShip"]
 
 
-from .bullets import Bomb
+from .steering import GO_STRAIGHT_TO, GO_TO, HOVER
 
 
 class Cooldown:
@@ -23,6 +23,10 @@ class Cooldown:
 
 
 class SpaceShip(Entity):
+    TEAM = "enemy"
+    """Collision group of the hitbox."""
+    OPPONENTS = "player"
+    """Collision group hit by the bullets of the ship."""
     GUN = (16, 18)
     MAX_THRUST = 0.2
     KNOCK_BACK = 2
@@ -56,107 +60,17 @@ class SpaceShip(Entity):
 
         self.debuffs = set()
 
+        # Ship -> for how many frames it has been overlapping this one.
         self.overlapping_ships = {}
+        self.touching_ships = {}
 
-    def force_to_move_towards(self, goal):
-        direction = goal - self.pos
-        direction.scale_to_length(self.max_speed)
-
-        perp = part_perp_to(direction, self.vel)
-        return perp
-
-    def force_slow_down_around(self, point, radius=60):
-        slow_force = pygame.Vector2()
-        dist = self.pos.distance_to(point)
-        if dist < radius:
-            slow_force = -self.vel * chrange(
-                radius - dist, (0, radius), (0, self.MAX_THRUST * 2), 2
-            )
-
-        return slow_force
-
-    def force_to_accelerate(self):
-        if self.vel.length() < self.max_speed:
-            return self.vel * self.MAX_THRUST
-        return pygame.Vector2()
-
-    def force_to_slow_down(self, target=0.0):
-        if self.vel.length() < target:
-            return pygame.Vector2()
-        return -self.vel.normalize() * self.MAX_THRUST
-
-    def force_to_avoid_walls(self, radius):
-        p = self.pos
-
-        wall = [
-            p.x - WORLD.left,
-            p.y - WORLD.top,
-            WORLD.right - self.size.x - p.x,
-            WORLD.bottom - self.size.y - p.y,
-        ]
-        normals = [(1, 0), (0, 1), (-1, 0), (0, -1)]
-
-        force = pygame.Vector2()
-        for dist, normal in zip(wall, normals):
-            normal = pygame.Vector2(normal)
-            if dist < radius:
-                normal.scale_to_length(2 * radius / max(1, dist) * self.MAX_THRUST)
-                force += normal
-
-        return force
-
-    def force_to_avoid(self, pos, radius):
-        p = self.center
-        distance = pos - p
-        dist = distance.length()
-
-        if dist > radius or dist == 0:
-            return pygame.Vector2()
-
-        norm = chrange(
-            max(0, dist - radius / 2),
-            (0, radius / 2),
-            (0, self.MAX_THRUST * 2),
-            flipped=True,
-        )
-
-        distance.scale_to_length(norm)
-        return -distance
-
-    def force_to_avoid_all_ships(self, avoid_player=True):
-        from src.objects import Enemy
-
-        thrust = pygame.Vector2()
-        for ship in self.state.get_all(SpaceShip if avoid_player else Enemy, Bomb):
-            if ship is self:
-                continue
-            r = ship.size.length() + self.size.length()
-            thrust += self.force_to_avoid(ship.center, r)
-        return thrust
-
-    def force_to_stay_close(self, pos, radius):
-        p = self.pos
-        distance = pos - p
-        dist = distance.length()
-
-        if dist < radius:
-            return pygame.Vector2()
-
-        dist = min(dist, 2 * radius)
-
-        norm = chrange(dist, (radius, 2 * radius), (0, self.MAX_THRUST * 2))
-        distance.scale_to_length(norm)
-        return distance
-
-    def force_to_stay_up(self, up=0):
-        dist = self.pos.y - up
-
-        dist = max(0, dist)
-        return (
-            pygame.Vector2(0, -1)
-            * self.MAX_THRUST
-            * chrange(dist, (0, WORLD.height - up), (0, 1))
+        self.hitbox = RectCollider(self, self.TEAM)
+        self.body = CircleCollider(
+            self, "ship", self.size.length() / 2, ["ship"], self.touch
         )
+        # The neighbours that steering avoids are found with these.
+        self.personal_space = CircleCollider(self, "avoid", self.size.length())
+        self.colliders += [self.hitbox, self.body, self.personal_space]
 
     def random_but_high(self, avoid=(), margin=40) -> pygame.Vector2:
 
@@ -174,21 +88,7 @@ class SpaceShip(Entity):
             )
 
         while self.center.distance_to(goal) > precision:
-
-            thrust = self.force_to_avoid_all_ships()
-            if thrust.length() == 0:
-                self.state.debug.point(*self.center, "red")
-                thrust += self.force_to_move_towards(goal)
-                thrust += self.force_to_accelerate() * 0.1
-                thrust += self.force_slow_down_around(goal, 60)
-                thrust += self.force_to_avoid_walls(30)
-            else:
-                self.state.debug.point(*self.center, "green")
-
-            clamp_length(thrust, self.MAX_THRUST)
-
-            self.vel += thrust
-
+            self.state.steering.request(self, GO_TO, goal)
             yield
 
     def go_straight_to(self, goal=None, precision=40, max_duration=3 * 60):
@@ -200,18 +100,7 @@ class SpaceShip(Entity):
         timer = 0
         while self.center.distance_to(goal) > precision and timer < max_duration:
             timer += 1
-
-            thrust = self.force_to_avoid_all_ships(False)
-            if thrust.length() == 0:
-                self.state.debug.point(*self.center, "red")
-                thrust += (goal - self.center).normalize() * self.MAX_THRUST
-            else:
-                self.state.debug.point(*self.center, "green")
-
-            clamp_length(thrust, self.MAX_THRUST)
-
-            self.vel += thrust
-
+            self.state.steering.request(self, GO_STRAIGHT_TO, goal)
             yield
 
     def run_and_wait(self, generator, waiting, exact=False):
@@ -222,34 +111,14 @@ class SpaceShip(Entity):
             if exact and frames == waiting:
                 return
 
-        for _ in range(frames, waiting):
-            yield
+        if frames < waiting:
+            yield Sleep(waiting - frames)
 
     def hover_around(self, duration):
-        from . import Enemy
-
-        state = App.current_state()
-        player = state.player
+        player = self.state.player
 
         for _ in range(int(duration)):
-
-            thrust = self.force_to_avoid_all_ships()
-            if thrust.length() == 0:
-                # dont go too close to the player
-                thrust += self.force_to_avoid(player.pos, 100) * 0.3
-                # don't go too far either
-                thrust += self.force_to_stay_close(player.pos, 300)
-                thrust += self.force_to_slow_down(self.max_speed / 5) * 0.1
-                thrust += self.force_to_stay_up(WORLD.height / 4)
-
-                thrust += self.force_to_avoid_walls(30)
-
-                # Avoid other enemies
-                for enemy in state.get_all(Enemy):
-                    if enemy is not self:
-                        thrust += self.force_to_avoid(enemy.pos, 50)
-
-            self.vel += clamp_length(thrust, self.MAX_THRUST)
+            self.state.steering.request(self, HOVER, player.pos)
             yield
 
     def slow_down_and_stop(self, frames=1):
@@ -291,31 +160,31 @@ class SpaceShip(Entity):
     def logic(self):
         super().logic()
 
-        new_overlapping = {}
-        for ship in self.state.get_all(SpaceShip):
-            if ship is self:
-                continue
-
-            radius_sum = self.size.length() / 2 + ship.size.length() / 2
-            if self.center.distance_to(ship.center) < radius_sum:
-                new_overlapping[ship] = self.overlapping_ships.get(ship, -1) + 1
-
-        self.overlapping_ships = new_overlapping
-        for ship, duration in self.overlapping_ships.items():
-            if duration % 20 == 0:
-                play("hit")
-                self.damage(
-                    ship.CONTACT_DAMAGE * self.CONCTACT_RESISTANCE,
-                    ignore_invincibility=True,
-                )
+        # The collision system calls touch() for this frame
+        self.overlapping_ships = self.touching_ships
+        self.touching_ships = {}
 
-        to_remove = set()
+        to_remove = []
         for debuff in self.debuffs:
             debuff.apply(self)
             if debuff.done:
-                to_remove.add(debuff)
+                to_remove.append(debuff)
         self.debuffs.difference_update(to_remove)
 
+    def touch(self, other: Collider):
+        """Called by the collision system for each ship overlapping this one."""
+
+        ship = other.owner
+        duration = self.overlapping_ships.get(ship, -1) + 1
+        self.touching_ships[ship] = duration
+
+        if duration % 20 == 0:
+            play("hit")
+            self.damage(
+                ship.CONTACT_DAMAGE * self.CONCTACT_RESISTANCE,
+                ignore_invincibility=True,
+            )
+
     def on_death(self, state):
         play("explosion")
         for _ in range(200):
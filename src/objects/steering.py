@@ -0,0 +1,231 @@
+from typing import List, Tuple
+
+import numpy as np
+import pygame
+
+from src.engine import *
+
+__all__ = ["Steering", "GO_TO", "GO_STRAIGHT_TO", "HOVER"]
+
+# Behaviours
+GO_TO = 0
+"""Curve towards the goal, slowing down around it and avoiding the walls."""
+GO_STRAIGHT_TO = 1
+"""Go in straight line to the goal, ignoring the player."""
+HOVER = 2
+"""Stay around the goal (the player), but not too close, and high in the screen."""
+
+WALL_NORMALS = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)], float)
+
+
+def _length(vectors):
+    return np.sqrt((vectors ** 2).sum(axis=-1))
+
+
+def _scale_to_length(vectors, length):
+    """Scale all non-zero vectors to the given length. Zero vectors stay zero."""
+    norm = _length(vectors)
+    safe = np.where(norm > 0, norm, 1)
+    return vectors * (length / safe)[..., None]
+
+
+def _avoid(delta, radius, max_thrust):
+    """Force to move away from points that are closer than radius.
+
+    Args:
+        delta: position of the points relative to the ships, shape (..., 2)
+        radius: distance at which the force starts
+        max_thrust: of the ships
+    """
+
+    dist = _length(delta)
+    active = (dist <= radius) & (dist > 0)
+    half = radius / 2
+    norm = (1 - np.maximum(0, dist - half) / half) * 2 * max_thrust
+    return -_scale_to_length(delta, np.where(active, norm, 0))
+
+
+class Steering:
+    """
+    Compute the thrust of all the ships in one numpy step.
+
+    Every frame, the scripts of the ships only request a behaviour and a goal.
+    Then all the forces are computed at once and added to the velocities,
+    which take effect on the next frame.
+    """
+
+    WALL_RADIUS = 30
+
+    def __init__(self, state):
+        self.state = state
+        self.requests: List[Tuple["SpaceShip", int, Tuple[float, float]]] = []
+
+    def request(self, ship, behaviour, goal):
+        self.requests.append((ship, behaviour, tuple(goal)))
+
+    def logic(self):
+        from src.objects import Enemy, SpaceShip
+
+        requests = [r for r in self.requests if r[0].alive]
+        self.requests = []
+        if not requests:
+            return
+
+        ships = [ship for ship, _, _ in requests]
+        behaviour = np.array([b for _, b, _ in requests])
+        goal = np.array([g for _, _, g in requests], float)
+
+        pos = np.array([tuple(ship.pos) for ship in ships], float)
+        vel = np.array([tuple(ship.vel) for ship in ships], float)
+        size = np.array([tuple(ship.size) for ship in ships], float)
+        center = pos + size / 2
+        max_thrust = np.array([ship.MAX_THRUST for ship in ships], float)
+        max_speed = np.array([ship.max_speed for ship in ships], float)
+        speed = _length(vel)
+
+        # Separation, only with the ships and bombs around, from the collision grid.
+        # Hovering ships also look for the enemies to avoid further away. The rects
+        # of the colliders are rounded, so the queries are a bit larger.
+        collisions = self.state.collisions
+        avoid = collisions.groups.get("avoid", [])
+        index = {collider: j for j, collider in enumerate(avoid)}
+        ship_index = []
+        obstacle_index = []
+        around = pygame.Rect(0, 0, 100, 100)
+        for i, (ship, b, _) in enumerate(requests):
+            rect = ship.personal_space.rect
+            if b == HOVER:
+                around.center = ship.center
+                rect = rect.union(around)
+            found = [
+                index[collider]
+                for collider in collisions.query(rect.inflate(4, 4), "avoid")
+                if collider.owner is not ship
+            ]
+            ship_index += [i] * len(found)
+            obstacle_index += found
+
+        obstacles = [collider.owner for collider in avoid]
+        obstacle_pos = np.array([tuple(o.pos) for o in obstacles], float).reshape(-1, 2)
+        obstacle_size = np.array([tuple(o.size) for o in obstacles], float).reshape(-1, 2)
+        obstacle_center = obstacle_pos + obstacle_size / 2
+        is_enemy = np.array([isinstance(o, Enemy) for o in obstacles], bool)
+        is_ship = np.array([isinstance(o, SpaceShip) for o in obstacles], bool)
+        alive = np.array([o.alive for o in obstacles], bool)
+
+        # Objects that died since the collisions are ignored
+        ship_index = np.array(ship_index, int)
+        obstacle_index = np.array(obstacle_index, int)
+        kept = alive[obstacle_index]
+        ship_index, obstacle_index = ship_index[kept], obstacle_index[kept]
+
+        # go_straight_to only avoids the enemies and the bombs
+        avoided = (behaviour[ship_index] != GO_STRAIGHT_TO) | (
+            is_enemy | ~is_ship
+        )[obstacle_index]
+        radius = _length(size)[ship_index] + _length(obstacle_size)[obstacle_index]
+        push = _avoid(
+            obstacle_center[obstacle_index] - center[ship_index],
+            radius,
+            max_thrust[ship_index],
+        )
+        separation = np.zeros_like(pos)
+        np.add.at(separation, ship_index[avoided], push[avoided])
+        free = np.all(separation == 0, axis=1)
+
+        walls = self.force_to_avoid_walls(pos, size, max_thrust)
+
+        # Go to
+        direction = _scale_to_length(goal - pos, max_speed)
+        moving = speed > 0
+        unit_vel = _scale_to_length(vel, 1)
+        towards = np.where(
+            moving[:, None],
+            direction - unit_vel * (unit_vel * direction).sum(axis=1)[:, None],
+            direction,
+        )
+        accelerate = np.where(
+            (speed < max_speed)[:, None], vel * max_thrust[:, None], 0
+        )
+        dist_to_goal = _length(pos - goal)
+        slow_radius = 60
+        slow_down_around = -vel * np.where(
+            dist_to_goal < slow_radius,
+            ((slow_radius - dist_to_goal) / slow_radius) ** 2 * 2 * max_thrust,
+            0,
+        )[:, None]
+        go_to = towards + accelerate * 0.1 + slow_down_around + walls
+
+        # Go straight to
+        go_straight_to = _scale_to_length(goal - center, max_thrust)
+
+        # Hover around
+        avoid_goal = _avoid(goal - center, 100, max_thrust) * 0.3
+
+        to_goal = goal - pos
+        dist = np.minimum(_length(to_goal), 2 * 300)
+        stay_close = _scale_to_length(
+            to_goal, np.where(dist < 300, 0, (dist - 300) / 300 * 2 * max_thrust)
+        )
+
+        slow_down = np.where(
+            (speed < max_speed / 5)[:, None], 0, -unit_vel * max_thrust[:, None]
+        )
+
+        up = WORLD.height / 4
+        stay_up = np.zeros_like(pos)
+        stay_up[:, 1] = -max_thrust * np.maximum(0, pos[:, 1] - up) / (WORLD.height - up)
+
+        near_enemy = is_enemy[obstacle_index]
+        push = _avoid(
+            obstacle_pos[obstacle_index] - center[ship_index],
+            50,
+            max_thrust[ship_index],
+        )
+        avoid_enemies = np.zeros_like(pos)
+        np.add.at(avoid_enemies, ship_index[near_enemy], push[near_enemy])
+
+        hover = (
+            avoid_goal + stay_close + slow_down * 0.1 + stay_up + walls + avoid_enemies
+        )
+
+        # Only when there is no ship to avoid
+        thrust = separation + np.where(
+            free[:, None],
+            np.choose(behaviour[:, None], [go_to, go_straight_to, hover]),
+            0,
+        )
+
+        length = _length(thrust)
+        thrust = np.where(
+            (length > max_thrust)[:, None],
+            _scale_to_length(thrust, max_thrust),
+            thrust,
+        )
+
+        for ship, (dx, dy) in zip(ships, thrust):
+            ship.vel.x += dx
+            ship.vel.y += dy
+
+        if self.state.debug.enabled:
+            for ship, b, f in zip(ships, behaviour, free):
+                if b != HOVER:
+                    self.state.debug.point(*ship.center, "red" if f else "green")
+
+    def force_to_avoid_walls(self, pos, size, max_thrust):
+        radius = self.WALL_RADIUS
+        wall = np.stack(
+            [
+                pos[:, 0] - WORLD.left,
+                pos[:, 1] - WORLD.top,
+                WORLD.right - size[:, 0] - pos[:, 0],
+                WORLD.bottom - size[:, 1] - pos[:, 1],
+            ],
+            axis=1,
+        )
+        strength = np.where(
+            wall < radius,
+            2 * radius / np.maximum(1, wall) * max_thrust[:, None],
+            0,
+        )
+        return strength @ WALL_NORMALS
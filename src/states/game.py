@@ -1,27 +1,133 @@
+from functools import partial
 from random import choice, gauss
+from typing import Optional
 
 from pygame import Rect, Vector2
 
 from src.engine import *
 from pygame import Vector2
 
-from src.level import LEVELS
+from src.level import LEVELS, Level
 from src.objects import *
 from .my_state import MyState
 from .name import NameInputState
 from .skillpickup import SkillPickUp
 
 
+class InfoPanel(Panel):
+    """The panel on the right of the game, with the score, the stats and the skill tree."""
+
+    HP = (24, 81)
+    CRIT = HP[0], HP[1] + 26
+    REGEN = HP[0], CRIT[1] + 48
+    ATK = HP[0] + 161, HP[1] + 5
+    BURN = ATK[0], ATK[1] + 69
+    TRIVIA = Rect((5, 304), (198, 32))
+
+    def __init__(self, game: "GameState"):
+        super().__init__(INFO_RECT)
+        self.game = game
+        player = game.player
+
+        self.add(Widget(lambda: None, lambda _: image("inforect")))
+
+        # The score
+        self.add(
+            Widget(
+                lambda: player.score,
+                lambda score: auto_crop(font(20).render(str(score), False, YELLOW)),
+                bottomright=(197, 39),
+            )
+        )
+
+        self.add(Widget(self.skill_tree_levels, self.render_skill_tree))
+
+        self.add(Widget(lambda: int(player.life), self.stat, topleft=self.HP))
+        self.add(
+            Widget(
+                lambda: f"{int(player.crit_chance * 100)}%", self.stat, topleft=self.CRIT
+            )
+        )
+        self.add(Widget(self.regen, self.stat, topleft=self.REGEN))
+        self.add(
+            Widget(lambda: int(player.bullet_damage), self.stat, topright=self.ATK)
+        )
+        self.add(
+            Widget(
+                lambda: f"{int(100 * player.fire_chance)}%", self.stat, topright=self.BURN
+            )
+        )
+
+        self.add(
+            Widget(
+                lambda: game.triva,
+                lambda triva: wrapped_text(
+                    triva, 7, "#5a6988", self.TRIVIA.w, "pixelmillennium"
+                ),
+                center=self.TRIVIA.center,
+            )
+        )
+
+    @staticmethod
+    def stat(value):
+        return text(str(value), 7, WHITE, name="pixelmillennium")
+
+    def regen(self):
+        player = self.game.player
+        for debuff in player.debuffs:
+            if isinstance(debuff, RegenDebuff):
+                return int(debuff.strength * player.max_life)
+        return 0
+
+    def skill_tree_levels(self):
+        return tuple(node.power.level for node in self.game.player.skill_tree.bfs())
+
+    def render_skill_tree(self, _levels):
+        surf = pygame.Surface(self.rect.size)
+        surf.set_colorkey((0, 0, 0))
+
+        tree = self.game.player.skill_tree
+        tree.layout((self.rect.width // 2 + 1, 209))
+        gfx = GFX(surf)
+        tree.draw(gfx)
+        gfx.flush()
+
+        return surf
+
+
 class GameState(MyState):
+    TRANSIENT = MyState.TRANSIENT + ("info_panel",)
+    QUICKSAVE = ASSETS_DIR / "quicksave"
+    quicksave_data: Optional[bytes] = None
+    """The last quicksave, so that quickload() never reads the file. See load_quicksave()."""
+
     def __init__(self):
+        self.level_index = 0
+        """Index of the current level in LEVELS."""
+        self.lvl = None
+        """The current level, None between levels."""
         super().__init__()
 
+        self.steering = Steering(self)
         self.player = self.add(Player((100, 200)))
         self.add(
             HealthBar((INFO_RECT.topleft + Vector2(9, 347), (180, 5)), RED, self.player)
         )
 
         self.triva = self.get_trivia()
+        self.info_panel = InfoPanel(self)
+
+    def restore(self):
+        super().restore()
+        self.info_panel = InfoPanel(self)
+        # The script shows the titles again
+        for title in self.get_all(Title):
+            title.alive = False
+
+    def logic(self):
+        super().logic()
+        # After the scripts of the ships requested where to go.
+        self.steering.logic()
 
     def create_inputs(self):
         inputs = super().create_inputs()
@@ -47,6 +153,11 @@ class GameState(MyState):
         inputs["pause"] = Button(pygame.K_p, JoyButton(JOY_Y), JoyButton(JOY_X))
         inputs["pause"].on_press(self.set_pause)
 
+        inputs["quicksave"] = Button(pygame.K_F5)
+        inputs["quicksave"].on_press(self.quicksave)
+        inputs["quickload"] = Button(pygame.K_F9)
+        inputs["quickload"].on_press(self.quickload)
+
         # def cheat(_):
         #     self.lvl.skip = True
         #     for en in self.get_all(Enemy):
@@ -62,6 +173,27 @@ class GameState(MyState):
 
         self.push_state(PauseState(self))
 
+    def quicksave(self, *_):
+        data = snapshot(self)
+        GameState.quicksave_data = data
+        writer.write(partial(atomic_write_bytes, self.QUICKSAVE, data), self.QUICKSAVE)
+
+    def quickload(self, *_):
+        if self.quicksave_data is not None:
+            self.replace_state(load_snapshot(self.quicksave_data))
+
+    @classmethod
+    def load_quicksave(cls):
+        """Read the quicksave of the last session in the background, for quickload()."""
+
+        def read():
+            if cls.QUICKSAVE.exists():
+                data = cls.QUICKSAVE.read_bytes()
+                if cls.quicksave_data is None:  # Unless there was a quicksave since
+                    cls.quicksave_data = data
+
+        writer.write(read, delay=0)
+
     def on_resume(self):
         super().on_resume()
         self.debug.paused = False
@@ -70,14 +202,19 @@ class GameState(MyState):
         self.debug.paused = True
 
     def script(self):
-        for i, level in enumerate(LEVELS):
-            self.triva = self.get_trivia()
+        # Starts from the current level when restored from a snapshot.
+        for i in range(self.level_index, len(LEVELS)):
+            if self.lvl is None:
+                self.triva = self.get_trivia()
+
+                # Draw level name
+                yield from self.add(
+                    Title(f"Level {i + 1}", duration=60)
+                ).wait_until_dead()
 
-            # Draw level name
-            yield from self.add(Title(f"Level {i + 1}", duration=60)).wait_until_dead()
+                self.lvl = Level(self, LEVELS[i])
 
             # Run the level
-            self.lvl = level(self)
             yield from self.lvl.script()
             yield from self.lvl.wait_until_dead()
 
@@ -88,11 +225,13 @@ class GameState(MyState):
                 ).wait_until_dead()
 
             self.push_state(SkillPickUp(self.player))
+            self.lvl = None
+            self.level_index = i + 1
 
         self.add(Title("You won!", ORANGE, animation="blink"))
 
         for _ in range(200):
-            yield from range(6)
+            yield Sleep(6)
             center = random_in_rect(WORLD)
             color = choice([ORANGE, RED, GREEN, YELLOW])
             for i in range(100):
@@ -116,56 +255,7 @@ class GameState(MyState):
         self.draw_info(gfx)
 
     def draw_info(self, gfx: GFX):
-        bg = image("inforect")
-        gfx.surf.blit(bg, INFO_RECT)
-
-        # The score
-        score = auto_crop(font(20).render(str(self.player.score), False, YELLOW))
-        gfx.blit(score, bottomright=INFO_RECT.topleft + Vector2(197, 39))
-
-        self.player.skill_tree.layout((INFO_RECT.centerx + 1, 209))
-        self.player.skill_tree.draw(gfx)
-
-        HP = (24 + INFO_RECT.x, 81 + INFO_RECT.y)
-        CRIT = HP[0], HP[1] + 26
-        REGEN = HP[0], CRIT[1] + 48
-        ATK = HP[0] + 161, HP[1] + 5
-        BURN = ATK[0], ATK[1] + 69
-
-        def get(txt, color):
-            if isinstance(txt, (float)):
-                txt = int(txt)
-            return text(str(txt), 7, WHITE, name="pixelmillennium")
-
-        # HP
-        s = get(self.player.life, GREEN)
-        gfx.blit(s, topleft=HP)
-
-        # CRIT
-        s = get(f"{int(self.player.crit_chance * 100)}%", RED)
-        gfx.blit(s, topleft=CRIT)
-
-        # REGEN
-        regen = 0
-        for debuff in self.player.debuffs:
-            if isinstance(debuff, RegenDebuff):
-                regen = debuff.strength * self.player.max_life
-        s = get(regen, GREEN)
-        gfx.blit(s, topleft=REGEN)
-
-        # ATK
-        s = get(self.player.bullet_damage, RED)
-        gfx.blit(s, topright=ATK)
-
-        # BURN
-        s = get(f"{int(100 * self.player.fire_chance)}%", ORANGE)
-        gfx.blit(s, topright=BURN)
-
-        TRIVAL_TL = Vector2(5, 304) + INFO_RECT.topleft
-        TRIVAL_SIZE = (198, 32)
-        r = Rect(TRIVAL_TL, TRIVAL_SIZE)
-        s = wrapped_text(self.triva, 7, "#5a6988", r.w, "pixelmillennium")
-        gfx.blit(s, center=r.center)
+        self.info_panel.draw(gfx)
 
     def get_trivia(self):
         return choice(
@@ -4,6 +4,8 @@ from .my_state import MyState
 
 
 class GameOverState(MyState):
+    DIRTY_RECTS = True
+
     def __init__(self, player):
         super().__init__()
 
@@ -6,6 +6,8 @@ from src.states import MyState
 
 
 class HighScoreState(MyState):
+    DIRTY_RECTS = True
+
     def __init__(self):
         super().__init__()
 
@@ -13,6 +15,12 @@ class HighScoreState(MyState):
             Text("Leaderboards", YELLOW, 48, midtop=(W / 2, TITLE_MARGIN))
         )
 
+        last = settings.last_score
+        self.last_score = tuple(last) if last is not None else None
+        self.scores = scores.top(HIGH_SCORES_ENTRIES)
+        if self.last_score is not None and self.last_score not in self.scores:
+            self.scores.append(self.last_score)
+
     def create_inputs(self) -> Inputs:
         inputs = super().create_inputs()
 
@@ -28,23 +36,15 @@ class HighScoreState(MyState):
         left = W / 4
         right = W / 4 * 3
 
-        scores = settings.highscores[:]
-        if (
-            settings.last_score is not None
-            and settings.highscores.count(settings.last_score) == 0
-        ):
-            scores.append(settings.last_score)
-
-        if not scores:
-            scores = [("yet!", "There are no scores...")]
+        entries = self.scores or [("yet!", "There are no scores...")]
 
-        surfs = [text(name, 24, WHITE) for _, name in scores]
+        surfs = [text(name, 24, WHITE) for _, name in entries]
 
         h = sum(s.get_height() for s in surfs)
         title_height = TITLE_MARGIN + self.title.size.y
         y = (title_height + H) / 2 - h / 2
-        for score, name in scores:
-            if [score, name] == settings.last_score:
+        for score, name in entries:
+            if (score, name) == self.last_score:
                 color = YELLOW
             else:
                 color = WHITE
@@ -3,6 +3,7 @@ from glob import glob
 from time import time
 
 from src.engine import *
+from .game import GameState
 from .my_state import MyState
 from .menu import MenuState
 from ..objects import Text
@@ -18,6 +19,7 @@ class LoadingState(State):
         self.images = list(IMAGES.glob("*.png"))
         self.progress = 0
         self.debug.enabled = 0
+        GameState.load_quicksave()
 
         self.add(Text(GAME_NAME, YELLOW, TITLE_SIZE, center=(W / 2, H / 3)))
 
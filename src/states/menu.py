@@ -7,6 +7,7 @@ from .skillpickup import SkillPickUp
 
 class MenuState(MyState):
     BG_MUSIC = "cozyFractal.oga"
+    DIRTY_RECTS = True
 
     def __init__(self):
         super().__init__()
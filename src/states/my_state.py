@@ -17,6 +17,10 @@ class MyState(State):
         self.particles.fountains.append(ParticleFountain.stars(self.BG_RECT))
         self.generate_planets(self.NB_PLANETS)
 
+    def restore(self):
+        super().restore()
+        self.particles.fountains.append(ParticleFountain.stars(self.BG_RECT))
+
     def generate_planets(self, nb):
         positions = []
         possibilities = list(range(Planet.TOTAL_PLANETS))
@@ -9,6 +9,7 @@ from .my_state import MyState
 
 class NameInputState(MyState):
     MAX_LEN = 15
+    DIRTY_RECTS = True
 
     def __init__(self, player):
         super().__init__()
@@ -52,14 +53,13 @@ class NameInputState(MyState):
         from . import GameOverState, HighScoreState
 
         if self.name:
-            self.replace_state(HighScoreState())
-
             entry = [self.player.score, self.name]
             settings.name = self.name
-            settings.highscores.append(entry)
-            settings.highscores.sort(reverse=True)
-            settings.highscores = settings.highscores[:HIGH_SCORES_ENTRIES]
+            scores.add(*entry)
             settings.last_score = entry
+            settings.save()
+
+            self.replace_state(HighScoreState())
             play("menu")
         else:
             play("denied")
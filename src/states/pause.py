@@ -1,3 +1,6 @@
+from typing import Optional
+
+import pygame
 from pygame import K_p
 
 from src.engine import *
@@ -7,10 +10,13 @@ from src.objects import Menu
 
 class PauseState(State):
     BG_COLOR = None
+    DIRTY_RECTS = True
 
     def __init__(self, game_state):
         super().__init__()
         self.game_state = game_state
+        self.frozen_frame: Optional[pygame.Surface] = None
+        """The game under the menu, see frozen()."""
 
         self.menu = self.add(
             Menu(
@@ -38,9 +44,28 @@ class PauseState(State):
     def stop_pause(self, *args):
         self.pop_state()
 
+    def on_exit(self):
+        super().on_exit()
+        self.frozen_frame = None
+
+    def resize(self, old, new):
+        super().resize(old, new)
+        self.frozen_frame = None
+
+    def frozen(self, size) -> pygame.Surface:
+        """The game, darkened. As it does not change, it is drawn only once."""
+
+        if self.frozen_frame is None or self.frozen_frame.get_size() != size:
+            self.frozen_frame = pygame.Surface(size)
+            gfx = GFX(self.frozen_frame)
+            self.game_state.draw(gfx)
+            gfx.box(SCREEN, (0, 0, 0, 180))
+            gfx.flush()
+
+        return self.frozen_frame
+
     def draw(self, gfx: GFX):
-        self.game_state.draw(gfx)
-        gfx.box(SCREEN, (0, 0, 0, 180))
+        gfx.blit(self.frozen(gfx.surf.get_size()), topleft=(0, 0))
 
         super().draw(gfx)
 
@@ -7,6 +7,8 @@ from .my_state import MyState
 
 
 class SkillPickUp(MyState):
+    DIRTY_RECTS = True
+
     def __init__(self, player):
         super().__init__()
 
@@ -142,7 +144,7 @@ class SkillPickUp(MyState):
         # Bottom backgorund
         bottom_rect = pygame.Rect(0, H - 54, W, 54)
         gfx.box(bottom_rect, (0, 0, 0, 180))
-        pygame.draw.line(gfx.surf, YELLOW, bottom_rect.topright, bottom_rect.topleft)
+        gfx.line(bottom_rect.topright, bottom_rect.topleft, YELLOW)
 
         if self.error_timer > 0:
             if isinstance(self.error_message, str):